@@ -0,0 +1,5 @@
+"""Benchmarks for path generation and cursor dispatch.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --compare benchmarks/baseline.json
+"""
@@ -0,0 +1,263 @@
+"""In-process stand-ins for the Page objects of the three backends.
+
+They implement just what GhostCursor.move uses and count the mouse events they
+receive. rtt adds a simulated browser round trip to every call, so that dispatch
+modes can be compared as if the browser were remote.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+# Two targets far enough apart that moves between them overshoot
+BOXES = {
+    "#a": {"x": 80.0, "y": 90.0, "width": 120.0, "height": 40.0},
+    "#b": {"x": 1400.0, "y": 760.0, "width": 160.0, "height": 48.0},
+}
+
+
+class Counter:
+    def __init__(self, rtt: float = 0.0):
+        self.rtt = rtt
+        self.moves = 0
+        self.calls = 0
+
+
+def _quads(box: Dict[str, float]) -> Dict:
+    x, y, w, h = box["x"], box["y"], box["width"], box["height"]
+    return {"quads": [[x, y, x + w, y, x + w, y + h, x, y + h]]}
+
+
+# pyppeteer
+
+
+class _PyppeteerKeyboard:
+    _modifiers = 0
+
+
+class _PyppeteerMouse:
+    def __init__(self, counter: Counter):
+        self._counter = counter
+        self._keyboard = _PyppeteerKeyboard()
+        self._x = self._y = 0
+        self._button = "none"
+
+    async def move(self, x: float, y: float, options: Optional[Dict] = None):
+        self._counter.calls += 1
+        self._counter.moves += 1
+        if self._counter.rtt:
+            await asyncio.sleep(self._counter.rtt)
+        self._x, self._y = x, y
+
+    async def down(self, options: Optional[Dict] = None):
+        self._counter.calls += 1
+        self._button = "left"
+
+    async def up(self, options: Optional[Dict] = None):
+        self._counter.calls += 1
+        self._button = "none"
+
+
+class _PyppeteerClient:
+    def __init__(self, counter: Counter, elements: Dict[str, "_PyppeteerElement"]):
+        self._counter = counter
+        self._elements = elements
+
+    def send(self, method: str, params: Optional[Dict] = None) -> asyncio.Future:
+        # Like pyppeteer's CDPSession.send, the message goes out right away and a
+        # future is returned
+        self._counter.calls += 1
+        if method == "Input.dispatchMouseEvent":
+            self._counter.moves += 1
+        result = None
+        if method == "DOM.getContentQuads":
+            result = _quads(self._elements[params["objectId"]].box)
+        elif method == "Browser.getWindowForTarget":
+            result = {"bounds": {"left": 0, "top": 0, "width": 1280, "height": 720}}
+        future = asyncio.get_event_loop().create_future()
+        if self._counter.rtt:
+            # The caller may have cancelled the call by the time it answers
+            asyncio.get_event_loop().call_later(
+                self._counter.rtt,
+                lambda: future.done() or future.set_result(result),
+            )
+        else:
+            future.set_result(result)
+        return future
+
+
+class _PyppeteerElement:
+    def __init__(self, selector: str):
+        self.box = BOXES[selector]
+        self._remoteObject = {"objectId": selector}
+
+    async def boundingBox(self):
+        return self.box
+
+
+class _PyppeteerTarget:
+    _targetId = "page"
+
+
+class _PyppeteerBrowser:
+    def isConnected(self):
+        return True
+
+
+class FakePyppeteerPage:
+    def __init__(self, rtt: float = 0.0):
+        self.counter = Counter(rtt)
+        self._elements = {selector: _PyppeteerElement(selector) for selector in BOXES}
+        self._client = _PyppeteerClient(self.counter, self._elements)
+        self.mouse = _PyppeteerMouse(self.counter)
+        self.browser = _PyppeteerBrowser()
+        self.target = _PyppeteerTarget()
+
+    async def querySelector(self, selector: str):
+        self.counter.calls += 1
+        return self._elements[selector]
+
+    async def evaluate(self, *args, **kwargs):
+        self.counter.calls += 1
+
+
+# Playwright
+
+
+class _AsyncMouse:
+    def __init__(self, counter: Counter):
+        self._counter = counter
+
+    async def move(self, x: float, y: float, steps: int = 1):
+        self._counter.calls += 1
+        self._counter.moves += 1
+        if self._counter.rtt:
+            await asyncio.sleep(self._counter.rtt)
+
+    async def down(self, **kwargs):
+        self._counter.calls += 1
+
+    async def up(self, **kwargs):
+        self._counter.calls += 1
+
+
+class _AsyncCDPSession:
+    def __init__(self, counter: Counter):
+        self._counter = counter
+
+    async def send(self, method: str, params: Optional[Dict] = None):
+        self._counter.calls += 1
+        if method == "Input.dispatchMouseEvent":
+            self._counter.moves += 1
+        if self._counter.rtt:
+            await asyncio.sleep(self._counter.rtt)
+
+
+class _AsyncElement:
+    def __init__(self, selector: str, counter: Counter):
+        self.box = BOXES[selector]
+        self._counter = counter
+
+    async def scroll_into_view_if_needed(self):
+        self._counter.calls += 1
+
+    async def bounding_box(self):
+        self._counter.calls += 1
+        return self.box
+
+
+class _Browser:
+    def is_connected(self):
+        return True
+
+
+class _AsyncContext:
+    def __init__(self, counter: Counter):
+        self._counter = counter
+        self.browser = _Browser()
+
+    async def new_cdp_session(self, page):
+        return _AsyncCDPSession(self._counter)
+
+
+class FakeAsyncPage:
+    def __init__(self, rtt: float = 0.0):
+        self.counter = Counter(rtt)
+        self.mouse = _AsyncMouse(self.counter)
+        self.context = _AsyncContext(self.counter)
+        self.viewport_size = {"width": 1280, "height": 720}
+        self._elements = {s: _AsyncElement(s, self.counter) for s in BOXES}
+
+    async def query_selector(self, selector: str):
+        self.counter.calls += 1
+        return self._elements[selector]
+
+    async def evaluate(self, *args, **kwargs):
+        self.counter.calls += 1
+
+
+class _SyncWrapper:
+    """Sync API object with the async implementation underneath, like Playwright's"""
+
+    def __init__(self, impl_obj):
+        self._impl_obj = impl_obj
+
+
+class _SyncMouse(_SyncWrapper):
+    def __init__(self, counter: Counter):
+        super().__init__(_AsyncMouse(counter))
+        self._counter = counter
+
+    def move(self, x: float, y: float, steps: int = 1):
+        self._counter.calls += 1
+        self._counter.moves += 1
+        if self._counter.rtt:
+            time.sleep(self._counter.rtt)
+
+    def down(self, **kwargs):
+        self._counter.calls += 1
+
+    def up(self, **kwargs):
+        self._counter.calls += 1
+
+
+class _SyncElement:
+    def __init__(self, selector: str, counter: Counter):
+        self.box = BOXES[selector]
+        self._counter = counter
+
+    def scroll_into_view_if_needed(self):
+        self._counter.calls += 1
+
+    def bounding_box(self):
+        self._counter.calls += 1
+        return self.box
+
+
+class _SyncContext:
+    def __init__(self, counter: Counter):
+        self._counter = counter
+        self.browser = _Browser()
+
+    def new_cdp_session(self, page):
+        return _SyncWrapper(_AsyncCDPSession(self._counter))
+
+
+class FakeSyncPage:
+    def __init__(self, rtt: float = 0.0):
+        self._impl_obj = FakeAsyncPage(rtt)
+        self.counter = self._impl_obj.counter
+        self.mouse = _SyncMouse(self.counter)
+        self.context = _SyncContext(self.counter)
+        self.viewport_size = {"width": 1280, "height": 720}
+        self._elements = {s: _SyncElement(s, self.counter) for s in BOXES}
+        self._loop = asyncio.new_event_loop()
+
+    def _sync(self, coro):
+        return self._loop.run_until_complete(coro)
+
+    def query_selector(self, selector: str):
+        self.counter.calls += 1
+        return self._elements[selector]
+
+    def evaluate(self, *args, **kwargs):
+        self.counter.calls += 1
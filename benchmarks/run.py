@@ -0,0 +1,316 @@
+"""Run the benchmark suite.
+
+    python -m benchmarks.run [--filter move] [--rtt 0.001]
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --tolerance 0.25
+
+Every benchmark reports its best per-call latency over --repeat rounds, the
+points it produced (or dispatched) per second and the peak memory traced by
+tracemalloc during one call. GhostCursor.move runs against the fake pages of
+benchmarks._fakes and is skipped for backends whose library is not installed.
+Import times are measured in fresh interpreters. The exit status is 1 when
+`import python_ghost_cursor` takes longer than --import-budget milliseconds, or
+with --compare when a benchmark is slower than the baseline by more than
+--tolerance.
+"""
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from python_ghost_cursor.shared._math import Vector, bezierCurve, overshoot
+from python_ghost_cursor.shared._spoof import path, get_path, get_random_box_point
+from python_ghost_cursor.shared._motion import motionModels
+from benchmarks import _fakes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A benchmark call returns how many points it produced or dispatched
+Case = Callable[[], int]
+Setup = Callable[[argparse.Namespace], Case]
+BENCHMARKS: List[Tuple[str, Setup]] = []
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS.append((name, setup))
+        return setup
+
+    return register
+
+
+START = Vector(120, 140)
+END = Vector(1480, 820)
+BOX = {"x": 1400, "y": 760, "width": 160, "height": 48}
+
+
+@benchmark("bezierCurve")
+def bench_bezier_curve(args: argparse.Namespace) -> Case:
+    import bezier  # noqa: F401, skip the benchmark when the extra is missing
+
+    rng = np.random.default_rng(0)
+
+    def case() -> int:
+        bezierCurve(START, END, None, rng)
+        return 0
+
+    return case
+
+
+@benchmark("path")
+def bench_path(args: argparse.Namespace) -> Case:
+    rng = np.random.default_rng(0)
+    end = dict(BOX, x=END.x, y=END.y)
+    return lambda: len(path(START, end, rng=rng))
+
+
+def model_benchmark(model: str) -> None:
+    # Same move as "path", so points/s compares the cost per point of the models
+    @benchmark("path[{}]".format(model))
+    def bench_model(args: argparse.Namespace) -> Case:
+        rng = np.random.default_rng(0)
+        end = dict(BOX, x=END.x, y=END.y)
+        return lambda: len(path(START, end, rng=rng, model=model))
+
+
+for _model in motionModels:
+    model_benchmark(_model)
+
+
+@benchmark("get_path")
+def bench_get_path(args: argparse.Namespace) -> Case:
+    rng = np.random.default_rng(0)
+    start = {"x": START.x, "y": START.y}
+    end = {"x": END.x, "y": END.y}
+    return lambda: len(get_path(start, end, rng))
+
+
+@benchmark("get_random_box_point")
+def bench_get_random_box_point(args: argparse.Namespace) -> Case:
+    rng = np.random.default_rng(0)
+
+    def case() -> int:
+        get_random_box_point(BOX, rng=rng)
+        return 1
+
+    return case
+
+
+@benchmark("overshoot")
+def bench_overshoot(args: argparse.Namespace) -> Case:
+    rng = np.random.default_rng(0)
+
+    def case() -> int:
+        overshoot(END, 120, rng)
+        return 1
+
+    return case
+
+
+def move_benchmark(backend: str, fake_page: type, mode: str) -> None:
+    @benchmark("{}.move[{}]".format(backend, mode))
+    def bench_move(args: argparse.Namespace) -> Case:
+        module = importlib.import_module("python_ghost_cursor.{}".format(backend))
+        page = fake_page(args.rtt)
+        cursor = module.create_cursor(page, rng=0)
+        cursor.dispatch_mode = mode
+        targets = itertools.cycle(_fakes.BOXES)
+        if backend == "playwright_sync":
+            move = cursor.move
+        else:
+            loop = asyncio.new_event_loop()
+
+            def move(selector: str) -> None:
+                loop.run_until_complete(cursor.move(selector))
+
+        def case() -> int:
+            moves = page.counter.moves
+            move(next(targets))
+            return page.counter.moves - moves
+
+        return case
+
+
+for _backend, _page in (
+    ("pyppeteer", _fakes.FakePyppeteerPage),
+    ("playwright_async", _fakes.FakeAsyncPage),
+    ("playwright_sync", _fakes.FakeSyncPage),
+):
+    for _mode in ("mouse", "cdp"):
+        move_benchmark(_backend, _page, _mode)
+
+
+def measure(case: Case, min_time: float, repeat: int) -> Dict[str, float]:
+    """Time case in repeat rounds of at least min_time seconds each"""
+    started = time.perf_counter()
+    case()
+    number = max(1, math.ceil(min_time / max(time.perf_counter() - started, 1e-9)))
+
+    best = math.inf
+    points_per_s = 0.0
+    for _ in range(repeat):
+        points = 0
+        started = time.perf_counter()
+        for _ in range(number):
+            points += case()
+        elapsed = time.perf_counter() - started
+        if elapsed / number < best:
+            best = elapsed / number
+            points_per_s = points / elapsed
+
+    # Traced separately, tracemalloc slows every allocation down
+    peak = 0
+    for _ in range(min(number, 20)):
+        tracemalloc.start()
+        case()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "latency_us": best * 1e6,
+        "points_per_s": points_per_s,
+        "peak_kib": peak / 1024,
+        "calls": number,
+    }
+
+
+# Import statements timed in fresh interpreters. The package itself loads
+# NumPy and the backends lazily, "import path" is the first path function access.
+IMPORTS = {
+    "import": "import python_ghost_cursor",
+    "import path": "from python_ghost_cursor import path",
+}
+
+
+def measure_import(statement: str, repeat: int) -> Dict[str, float]:
+    """Time an import statement in fresh interpreters"""
+    script = (
+        "import time; started = time.perf_counter(); {}; "
+        "print(time.perf_counter() - started)".format(statement)
+    )
+    best = math.inf
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=ROOT,
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout
+        best = min(best, float(output))
+    return {"latency_us": best * 1e6, "points_per_s": 0.0, "peak_kib": 0.0, "calls": 1}
+
+
+def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    results = {}
+    names = [name for name, _ in BENCHMARKS] + list(IMPORTS)
+    width = max(len(name) for name in names)
+    for name, setup in BENCHMARKS + [(name, None) for name in IMPORTS]:
+        if args.filter and args.filter not in name:
+            continue
+        if setup is None:
+            result = measure_import(IMPORTS[name], args.repeat)
+        else:
+            try:
+                case = setup(args)
+            except ModuleNotFoundError as e:
+                print("{:{}}  skipped, {}".format(name, width, e))
+                continue
+            result = measure(case, args.min_time, args.repeat)
+        results[name] = result
+        print(
+            "{:{}}  {:10.1f} us  {:12.0f} points/s  {:9.1f} KiB peak".format(
+                name,
+                width,
+                result["latency_us"],
+                result["points_per_s"],
+                result["peak_kib"],
+            )
+        )
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline: Dict, tolerance: float
+) -> List[str]:
+    """Get the names of the benchmarks that regressed against baseline"""
+    regressions = []
+    print("\nCompared with the baseline ({}):".format(baseline.get("python", "?")))
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["latency_us"] / before["latency_us"]
+        regressed = ratio > 1 + tolerance
+        if regressed:
+            regressions.append(name)
+        print(
+            "  {:32}  {:5.2f}x{}".format(name, ratio, "  REGRESSION" if regressed else "")
+        )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run", description="Run the benchmark suite"
+    )
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per round")
+    parser.add_argument(
+        "--rtt", type=float, default=0.0, help="simulated browser round trip, seconds"
+    )
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--import-budget",
+        type=float,
+        default=25.0,
+        help="milliseconds allowed for `import python_ghost_cursor`",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    status = 0
+    if "import" in results and results["import"]["latency_us"] > args.import_budget * 1e3:
+        print(
+            "\nimport python_ghost_cursor took {:.1f} ms, over the {:.1f} ms budget".format(
+                results["import"]["latency_us"] / 1e3, args.import_budget
+            )
+        )
+        status = 1
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "numpy": np.__version__,
+                    "machine": platform.machine(),
+                    "rtt": args.rtt,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""Compare paths served by PathTemplateCache with freshly generated paths.
+
+    python -m benchmarks.template_cache
+"""
+import argparse
+import time
+import numpy as np
+
+from python_ghost_cursor.shared._math import Vector
+from python_ghost_cursor.shared._spoof import path_points
+from python_ghost_cursor.shared._cache import PathTemplateCache
+
+
+def requests(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform(0, 1920, (count, 2))
+    ends = rng.uniform(0, 1080, (count, 2))
+    widths = rng.choice([20, 50, 100, 200], count)
+    return [
+        (Vector(*s), {"x": e[0], "y": e[1], "width": w})
+        for s, e, w in zip(starts.tolist(), ends.tolist(), widths.tolist())
+    ]
+
+
+def run(count: int) -> None:
+    pairs = requests(count)
+
+    rng = np.random.default_rng(1)
+    started = time.perf_counter()
+    for start, end in pairs:
+        path_points(start, end, rng=rng)
+    fresh = time.perf_counter() - started
+
+    cache = PathTemplateCache(rng=1)
+    # Warm up on a different set of requests so the measured run mostly hits
+    for start, end in requests(count, seed=1):
+        cache.path_points(start, end)
+    cache.hits = cache.misses = 0
+    started = time.perf_counter()
+    for start, end in pairs:
+        cache.path_points(start, end)
+    cached = time.perf_counter() - started
+
+    print("fresh   {:8.1f} us/path".format(fresh / count * 1e6))
+    print(
+        "cached  {:8.1f} us/path  ({} hits, {} misses, {} templates)".format(
+            cached / count * 1e6, cache.hits, cache.misses, len(cache)
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=20000)
+    run(parser.parse_args().count)
@@ -1,17 +1,56 @@
-import logging
-
-_logger = logging.getLogger(__name__)
-_logger.setLevel(logging.DEBUG)
+import importlib
 
 ### EXPORTS
 
-from .shared._spoof import get_path as path
+# Loaded on first access (PEP 562), so importing the package does not pull in
+# NumPy or a browser library: name -> (module, attribute, None for the module)
+_lazy = {
+    "path": (".shared._spoof", "get_path"),
+    "path_batch": (".shared._spoof", "path_batch"),
+    "split_batch": (".shared._spoof", "split_batch"),
+    "plan_route": (".shared._route", "plan_route"),
+    "Path": (".shared._path", "Path"),
+    "MotionModel": (".shared._motion", "MotionModel"),
+    "motionModels": (".shared._motion", "motionModels"),
+    "TrajectoryRecorder": (".shared._recording", "TrajectoryRecorder"),
+    "read_trajectories": (".shared._recording", "read_trajectories"),
+    "records_from_path": (".shared._recording", "records_from_path"),
+    "PathTemplateCache": (".shared._cache", "PathTemplateCache"),
+    "AdaptiveDensity": (".shared._adaptive", "AdaptiveDensity"),
+    "CursorMetrics": (".shared._metrics", "CursorMetrics"),
+    "serve_metrics": (".shared._metrics", "serve_metrics"),
+    "pyppeteer": (".pyppeteer", None),
+    "playwright_async": (".playwright_async", None),
+    "playwright_sync": (".playwright_sync", None),
+}
+
+
+def __getattr__(name):
+    if name not in _lazy:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    module_name, attribute = _lazy[name]
+    module = importlib.import_module(module_name, __name__)
+    value = module if attribute is None else getattr(module, attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy))
+
 
 # To support deprecations
+def _deprecation_warning(message: str) -> None:
+    # logging is imported here, it is a noticeable part of the package's import time
+    import logging
+
+    logging.getLogger(__name__).warning(message)
+
+
 def createCursor(*args, **kwargs):
     from .pyppeteer import create_cursor
 
-    _logger.warning(
+    _deprecation_warning(
         """DEPRECATION WARNING: 'createCursor' has been moved, please use the new version: 'from python_ghost_cursor.pyppeteer import create_cursor'.
         This method will be removed in a future release.
         """
@@ -25,7 +64,7 @@ def createCursor(*args, **kwargs):
 def installMouseHelper(*args, **kwargs):
     from .pyppeteer import install_mouse_helper
 
-    _logger.warning(
+    _deprecation_warning(
         """DEPRECATION WARNING: 'installMouseHelper' has been moved, please use the new version: 'from python_ghost_cursor.pyppeteer import install_mouse_helper'.
         This method will be removed in a future release.
         """
@@ -33,4 +72,21 @@ def installMouseHelper(*args, **kwargs):
     return install_mouse_helper(*args, **kwargs)
 
 
-__all__ = ["path", "createCursor", "installMouseHelper"]
+__all__ = [
+    "path",
+    "path_batch",
+    "split_batch",
+    "plan_route",
+    "Path",
+    "MotionModel",
+    "motionModels",
+    "TrajectoryRecorder",
+    "read_trajectories",
+    "records_from_path",
+    "PathTemplateCache",
+    "AdaptiveDensity",
+    "CursorMetrics",
+    "serve_metrics",
+    "createCursor",
+    "installMouseHelper",
+]
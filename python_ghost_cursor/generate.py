@@ -0,0 +1,150 @@
+"""Generate a synthetic mouse trajectory dataset.
+
+    python -m python_ghost_cursor.generate --count 1000000 --out paths/ --seed 42
+
+Paths are split into fixed-size shards, each with its own seed spawned from the
+master seed, so the output only depends on --seed, --count and --shard-size and
+never on the number of workers. Every shard is written by its worker straight to
+a compressed ``.npz`` file holding the flat ``points`` array, the ``offsets`` into
+it (path i is ``points[offsets[i]:offsets[i + 1]]``) and the ``starts``, ``ends``
+and ``widths`` the paths were generated from.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from python_ghost_cursor.shared._spoof import path_batch
+
+
+logger = logging.getLogger(__name__)
+
+
+def shard_name(index: int) -> str:
+    return "shard-{:05d}.npz".format(index)
+
+
+def generate_shard(
+    index: int,
+    seed: np.random.SeedSequence,
+    count: int,
+    out_dir: str,
+    viewport: Tuple[float, float] = (1920, 1080),
+    widths: Tuple[float, float] = (10, 300),
+    dtype: str = "float32",
+) -> str:
+    """Generate one shard of paths and write it to out_dir"""
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform((0, 0), viewport, (count, 2))
+    ends = rng.uniform((0, 0), viewport, (count, 2))
+    target_widths = rng.uniform(widths[0], widths[1], count)
+    points, offsets = path_batch(starts, ends, target_widths, seed=rng)
+
+    filename = os.path.join(out_dir, shard_name(index))
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        np.savez_compressed(
+            f,
+            points=points.astype(dtype),
+            offsets=offsets.astype(np.int64),
+            starts=starts.astype(dtype),
+            ends=ends.astype(dtype),
+            widths=target_widths.astype(dtype),
+        )
+    os.replace(tmp_filename, filename)
+    return filename
+
+
+def load_shard(filename: str) -> Dict[str, np.ndarray]:
+    """Load a shard written by generate_shard"""
+    with np.load(filename) as data:
+        return {key: data[key] for key in data.files}
+
+
+def generate(
+    count: int,
+    out_dir: str,
+    seed: Optional[int] = None,
+    shard_size: int = 10000,
+    workers: Optional[int] = None,
+    viewport: Tuple[float, float] = (1920, 1080),
+    widths: Tuple[float, float] = (10, 300),
+    dtype: str = "float32",
+) -> List[str]:
+    """Generate count paths into out_dir using a process pool"""
+    os.makedirs(out_dir, exist_ok=True)
+    master = np.random.SeedSequence(seed)
+    shards = math.ceil(count / shard_size)
+    seeds = master.spawn(shards)
+
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(
+            {
+                "count": count,
+                "seed": master.entropy,
+                "shard_size": shard_size,
+                "shards": [shard_name(i) for i in range(shards)],
+                "viewport": list(viewport),
+                "widths": list(widths),
+                "dtype": dtype,
+            },
+            f,
+            indent=2,
+        )
+
+    filenames = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                generate_shard,
+                i,
+                seeds[i],
+                min(shard_size, count - i * shard_size),
+                out_dir,
+                viewport,
+                widths,
+                dtype,
+            )
+            for i in range(shards)
+        ]
+        for future in futures:
+            filenames.append(future.result())
+            logger.info("Wrote %s (%d/%d)", filenames[-1], len(filenames), shards)
+    return filenames
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m python_ghost_cursor.generate",
+        description="Generate a synthetic mouse trajectory dataset",
+    )
+    parser.add_argument("--count", type=int, required=True, help="number of paths")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--seed", type=int, default=None, help="master seed")
+    parser.add_argument("--shard-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--viewport", type=float, nargs=2, default=(1920, 1080))
+    parser.add_argument("--widths", type=float, nargs=2, default=(10, 300))
+    parser.add_argument("--dtype", choices=["float32", "float64"], default="float32")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    generate(
+        args.count,
+        args.out,
+        seed=args.seed,
+        shard_size=args.shard_size,
+        workers=args.workers,
+        viewport=tuple(args.viewport),
+        widths=tuple(args.widths),
+        dtype=args.dtype,
+    )
+
+
+if __name__ == "__main__":
+    main()
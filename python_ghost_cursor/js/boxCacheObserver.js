@@ -0,0 +1,33 @@
+(() => {
+  if (window.__ghostCursorObserving) {
+    return
+  }
+  window.__ghostCursorObserving = true
+  // Every frame reports to the same counter on the Python side
+  const changed = () => {
+    if (window.__ghostCursorLayoutChanged) {
+      window.__ghostCursorLayoutChanged()
+    }
+  }
+  new MutationObserver(records => {
+    // The mouse helper moves its pointer on every mouse move, that is not a layout change
+    if (records.some(record => record.target.tagName !== 'P-MOUSE-POINTER')) {
+      changed()
+    }
+  }).observe(document, {
+    attributes: true,
+    characterData: true,
+    childList: true,
+    subtree: true
+  })
+  const observeResize = () => {
+    new ResizeObserver(changed).observe(document.documentElement)
+  }
+  if (document.documentElement) {
+    observeResize()
+  } else {
+    window.addEventListener('DOMContentLoaded', observeResize)
+  }
+  window.addEventListener('scroll', changed, { capture: true, passive: true })
+  window.addEventListener('resize', changed, { passive: true })
+})()
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import numpy as np
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from playwright.async_api import Page, ElementHandle
+
+from python_ghost_cursor.shared._math import Vector, origin
+from python_ghost_cursor.playwright_async._spoof import GhostCursor
+
+
+logger = logging.getLogger(__name__)
+
+
+class CursorPool:
+    """Own the cursors of many pages and coordinate them.
+
+    Paths are computed in an executor instead of on the event loop, calls to the
+    browser are capped per browser connection and click_all runs a batch of
+    clicks with bounded concurrency. Pass a ProcessPoolExecutor to move path
+    computation off the GIL as well, by default a thread pool owned by the pool
+    is used.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        max_concurrency: int = 8,
+        max_in_flight: int = 64,
+        seed: Optional[int] = None,
+    ):
+        self._owns_executor = executor is None
+        self.executor = executor if executor is not None else ThreadPoolExecutor()
+        self.max_concurrency = max_concurrency
+        self.max_in_flight = max_in_flight
+        self._seeds = np.random.SeedSequence(seed)
+        self._cursors: Dict[Page, GhostCursor] = {}
+        self._locks: Dict[Page, asyncio.Lock] = {}
+        self._limiters: Dict[Any, asyncio.Semaphore] = {}
+
+    def _limiter(self, page: Page) -> asyncio.Semaphore:
+        # Persistent contexts have no browser object, the context is the connection then
+        connection = page.context.browser or page.context
+        if connection not in self._limiters:
+            self._limiters[connection] = asyncio.Semaphore(self.max_in_flight)
+        return self._limiters[connection]
+
+    def cursor(self, page: Page, start: Union[Vector, Dict] = origin) -> GhostCursor:
+        """Get the cursor of a page, creating it on first use"""
+        if page not in self._cursors:
+            if isinstance(start, dict):
+                start = Vector(**start)
+            rng = np.random.default_rng(self._seeds.spawn(1)[0])
+            cursor = GhostCursor(page, start, rng)
+            cursor.executor = self.executor
+            cursor.dispatch_limiter = self._limiter(page)
+            self._cursors[page] = cursor
+            self._locks[page] = asyncio.Lock()
+            page.once("close", lambda _: self.remove(page))
+        return self._cursors[page]
+
+    def remove(self, page: Page) -> None:
+        """Forget the cursor of a page"""
+        self._cursors.pop(page, None)
+        self._locks.pop(page, None)
+
+    async def click_all(
+        self,
+        targets: Iterable[Tuple[Page, Union[str, ElementHandle]]],
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+        wait_for_click: Optional[float] = None,
+    ) -> List[Optional[BaseException]]:
+        """Click every (page, selector) pair, at most max_concurrency at a time.
+
+        Clicks on the same page run one after the other, in order. Returns None
+        for every click that succeeded and the exception for those that failed.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def click(page: Page, selector: Union[str, ElementHandle]) -> None:
+            cursor = self.cursor(page)
+            async with self._locks[page], semaphore:
+                await cursor.click(
+                    selector, padding_percentage, wait_for_selector, wait_for_click
+                )
+
+        results = await asyncio.gather(
+            *(click(page, selector) for page, selector in targets),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.debug("Warning: could not click, error message: %s", result)
+        return results
+
+    def close(self) -> None:
+        """Forget all cursors and shut down the executor if the pool created it"""
+        self._cursors.clear()
+        self._locks.clear()
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
@@ -1,169 +1,277 @@
 import asyncio
-import logging
-import random
-from typing import Union, Coroutine, Optional, Dict, List
+from concurrent.futures import Executor
+from typing import (
+    Union,
+    Coroutine,
+    Optional,
+    Dict,
+    List,
+    Awaitable,
+    Any,
+    Iterable,
+    Tuple,
+)
 from playwright.async_api import Page, ElementHandle, CDPSession
 
 from python_ghost_cursor.shared._math import (
     Vector,
     origin,
-    overshoot,
+    RandomSource,
+    spawnSeed,
+)
+from python_ghost_cursor.shared._spoof import path_points
+from python_ghost_cursor.shared._path import Path
+from python_ghost_cursor.shared._dispatch import (
+    mouse_moved_event,
+    mouse_wheel_event,
+    collect_errors,
+)
+from python_ghost_cursor.shared._scroll import (
+    scroll_delta_script,
+    scroll_settle_script,
+    wheel_playback,
 )
-from python_ghost_cursor.shared._spoof import (
-    path,
-    should_overshoot,
-    get_random_box_point,
+from python_ghost_cursor.shared._frames import (
+    content_offset_script,
+    scroll_position_script,
 )
+from python_ghost_cursor.shared._route import resolve_boxes_script
+from python_ghost_cursor.shared._keyboard import keystroke_playback
+from python_ghost_cursor.shared._box_cache import (
+    BoxCache,
+    binding,
+    observer_script,
+    settle_script,
+)
+from python_ghost_cursor.shared._async import AsyncCursor
+from python_ghost_cursor.shared._core import (
+    Command,
+    WaitForSelector,
+    Find,
+    Scroll,
+    ScrollDelta,
+    WaitForScroll,
+    Wheel,
+    TypeKeys,
+    FrameOwner,
+    ScrollPosition,
+    ResolveBoxes,
+    GetBox,
+    ComputePath,
+    Dispatch,
+)
+
 
+class GhostCursor(AsyncCursor):
+    """Executes the plans of CursorCore on a Playwright page (async API)"""
 
-logger = logging.getLogger(__name__)
+    def __init__(self, page: Page, start: Vector, rng: RandomSource = None):
+        super().__init__(page, start, rng)
+        # Set by CursorPool: where paths are computed (None means inline on the
+        # event loop) and the semaphore capping in-flight calls to the browser
+        self.executor: Optional[Executor] = None
+        self.dispatch_limiter: Optional[asyncio.Semaphore] = None
 
+    def _main_frame(self) -> Any:
+        return self.page.main_frame
 
-class GhostCursor:
-    def __init__(self, page: Page, start: Vector):
-        self.page = page
-        self.previous = start
-        self.moving = False
-        self.overshoot_spread = 10
-        self.overshoot_radius = 120
+    def _is_connected(self) -> bool:
+        # Persistent contexts have no browser object
+        browser = self.page.context.browser
+        return browser is None or browser.is_connected()
 
     async def get_cdp_session(self) -> Coroutine[None, None, CDPSession]:
         if not hasattr(self, "cdp_session"):
             self.cdp_session = await self.page.context.new_cdp_session(self.page)
         return self.cdp_session
 
+    async def get_window_bounds(self) -> Coroutine[None, None, Dict[str, float]]:
+        """Get the size of the viewport, or of the browser window without one"""
+        if self.page.viewport_size is not None:
+            return self.page.viewport_size
+        # Without a targetId, the window of the session's own target
+        cdp_session = await self.get_cdp_session()
+        window = await self._send(cdp_session.send("Browser.getWindowForTarget"))
+        return window["bounds"]
+
     async def get_random_page_point(self) -> Coroutine[None, None, Vector]:
         """Get a random point on a browser window"""
-        target_id = self.page.target._targetId
-        window = (await self.get_cdp_session()).send(
-            "Browser.getWindowForTarget", {"targetId": target_id}
-        )
-        return get_random_box_point(
-            {
-                "x": origin.x,
-                "y": origin.y,
-                "width": window["bounds"]["width"],
-                "height": window["bounds"]["height"],
-            }
-        )
+        return await self._run(self._random_point_plan())
 
-    async def random_move(self):
-        """Start random mouse movements. Function recursively calls itself"""
-        try:
-            if not self.moving:
-                rand = await self.get_random_page_point()
-                await self.trace_path(path(self.previous, rand), True)
-                self.previous = rand
-            await asyncio.sleep(random.random() * 2)
-            asyncio.ensure_future(
-                self.random_move()
-            )  # fire and forget, recursive function
-        except:
-            logger.debug("Warning: stopping random mouse movements")
-
-    async def trace_path(self, vectors: List[Vector], abort_on_move: bool = False):
-        """Move the mouse over a number of vectors"""
-        for v in vectors:
-            try:
-                # In case this is called from random mouse movements and the users wants to move the mouse, abort
-                if abort_on_move and self.moving:
-                    return
-                await self.page.mouse.move(v.x, v.y)
-                self.previous = v
-            except Exception as exc:
-                # Exit function if the browser is no longer connected
-                if not (await self.page.browser.is_connected()):
-                    return
-                logger.debug("Warning: could not move mouse, error message: %s", exc)
-
-    def toggle_random_move(self, random_: bool):
-        self.moving = not random_
-
-    async def click(
-        self,
-        selector: Optional[Union[str, ElementHandle]],
-        padding_percentage: Optional[float] = None,
-        wait_for_selector: Optional[float] = None,
-        wait_for_click: Optional[float] = None,
-    ):
-        self.toggle_random_move(False)
-        if selector is not None:
-            await self.move(selector, padding_percentage, wait_for_selector)
-            self.toggle_random_move(False)
+    async def _send(self, awaitable: Awaitable) -> Any:
+        """Await a browser call, holding a dispatch_limiter slot if there is one.
+
+        Every call that answers at once goes through here, wait_for_selector does
+        not: it would hold a slot for as long as it waits.
+        """
+        if self.dispatch_limiter is None:
+            return await awaitable
+        async with self.dispatch_limiter:
+            return await awaitable
 
+    async def _start(self, awaitable: Awaitable) -> "asyncio.Future":
+        """Start a pipelined browser call in a task, once a dispatch_limiter slot is free.
+
+        The slot is taken here, so calls started one after the other reach the
+        browser in that order, and the task releases it when the call returns.
+        """
+        if self.dispatch_limiter is None:
+            return asyncio.ensure_future(awaitable)
         try:
-            await self.page.mouse.down()
-            if wait_for_click is not None:
-                await asyncio.sleep(wait_for_click / 1000)
-            await self.page.mouse.up()
-        except Exception as exc:
-            logger.debug("Warning: could not click mouse, error message: %s", exc)
-
-        await asyncio.sleep(random.random() * 2)
-        self.toggle_random_move(True)
-
-    async def move(
-        self,
-        selector: Union[str, ElementHandle],
-        padding_percentage: Optional[float] = None,
-        wait_for_selector: Optional[float] = None,
-    ):
-        self.toggle_random_move(False)
-        elem = None
-        if isinstance(selector, str):
-            if wait_for_selector:
-                await self.page.wait_for_selector(selector, timeout=wait_for_selector)
-            elem = await self.page.query_selector(selector)
-            if elem is None:
-                raise Exception(
-                    'Could not find element with selector "${}", make sure you\'re waiting for the elements with "puppeteer.wait_for_selector"'.format(
-                        selector
+            await self.dispatch_limiter.acquire()
+        except BaseException:
+            awaitable.close()
+            raise
+        task = asyncio.ensure_future(awaitable)
+        task.add_done_callback(lambda _: self.dispatch_limiter.release())
+        return task
+
+    async def move_to(self, destination: dict, frame: Any = None):
+        """Move to a point, relative to frame's viewport when frame is given"""
+        await self._run(self._move_to_plan(destination, frame))
+
+    async def enable_box_cache(self) -> None:
+        """Cache element boxes between moves, until the page reports a layout change"""
+        if self.box_cache is not None:
+            return
+        self.box_cache = BoxCache()
+        await self.page.expose_binding(binding, lambda source: self.box_cache.changed())
+        script = observer_script()
+        await self.page.add_init_script(script)
+        await self.page.evaluate(script)
+        self._watch_frames()
+
+    # Command handlers
+
+    async def _on_wait_for_selector(self, command: WaitForSelector) -> None:
+        await self.page.wait_for_selector(command.selector, timeout=command.timeout)
+
+    async def _on_find(self, command: Find) -> Optional[ElementHandle]:
+        return await self._send(self.page.query_selector(command.selector))
+
+    async def _on_scroll(self, command: Scroll) -> None:
+        await self._send(command.element.scroll_into_view_if_needed())
+
+    async def _on_scroll_delta(self, command: ScrollDelta) -> List[float]:
+        return await self._send(command.element.evaluate(scroll_delta_script))
+
+    async def _on_wait_for_scroll(self, command: WaitForScroll) -> None:
+        await self._send(self.page.evaluate(scroll_settle_script, command.timeout))
+
+    async def _on_wheel(self, command: Wheel) -> Tuple[int, List[BaseException]]:
+        cdp_session = await self.get_cdp_session()
+        pending = []
+        for delay, delta_x, delta_y in wheel_playback(
+            command.deltas, command.timestamps
+        ):
+            if delay > 0:
+                await asyncio.sleep(delay)
+            pending.append(
+                await self._start(
+                    cdp_session.send(
+                        "Input.dispatchMouseEvent",
+                        mouse_wheel_event(command.position, delta_x, delta_y),
                     )
                 )
-        else:  # ElementHandle
-            elem = selector
-
-        # Make sure the object is in view
-        await elem.scroll_into_view_if_needed()
-        box = await elem.bounding_box()
-        if box is None:
-            raise Exception(
-                "Could not find the dimensions of the element you're clicking on, this might be a bug?"
             )
-        destination = get_random_box_point(box, padding_percentage)
-        dimensions = {"height": box["height"], "width": box["width"]}
-        overshooting = should_overshoot(self.previous, destination)
-        to = (
-            overshoot(destination, self.overshoot_radius)
-            if overshooting
-            else destination
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        return len(pending), collect_errors(results)
+
+    async def _on_type_keys(self, command: TypeKeys) -> Tuple[int, List[BaseException]]:
+        cdp_session = await self.get_cdp_session()
+        pending = []
+        for delay, event in keystroke_playback(command.timestamps, command.events):
+            if delay > 0:
+                await asyncio.sleep(delay)
+            pending.append(
+                await self._start(cdp_session.send("Input.dispatchKeyEvent", event))
+            )
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        return len(pending), collect_errors(results)
+
+    async def _on_frame_owner(
+        self, command: FrameOwner
+    ) -> Tuple[Any, Optional[Vector]]:
+        self._watch_frames()
+        parent = command.frame.parent_frame
+        if parent is None:
+            return None, None
+        element = await self._send(command.frame.frame_element())
+        x, y = await self._send(element.evaluate(content_offset_script))
+        return parent, Vector(x, y)
+
+    async def _on_scroll_position(self, command: ScrollPosition) -> Vector:
+        x, y = await self._send(self.page.evaluate(scroll_position_script))
+        return Vector(x, y)
+
+    async def _on_settle(self, command: Command) -> None:
+        await self._send(self.page.evaluate(settle_script))
+
+    async def _on_resolve_boxes(self, command: ResolveBoxes) -> Dict[str, Any]:
+        return await self._send(
+            self.page.evaluate(resolve_boxes_script, command.selectors)
+        )
+
+    async def _on_get_box(self, command: GetBox) -> Optional[Dict[str, float]]:
+        return await self._send(command.element.bounding_box())
+
+    async def _on_compute_path(self, command: ComputePath) -> Iterable[Vector]:
+        """Compute a path from the template cache, in the executor or inline.
+
+        Inline paths are computed lazily, chunk by chunk, while they are sent.
+        """
+        if self.executor is None or self.path_cache is not None:
+            return self._path_inline(
+                command.start, command.end, command.spread_override, command.density
+            )
+        # The worker gets a fresh seed so the cursor's own generator keeps advancing
+        points = await asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            path_points,
+            command.start,
+            command.end,
+            command.spread_override,
+            spawnSeed(self.rng),
+            True,
+            command.density,
+            self._model(),
+        )
+        return Path(points)
+
+    async def _on_mouse_down(self, command: Command) -> None:
+        await self._send(self.page.mouse.down())
+
+    async def _on_mouse_up(self, command: Command) -> None:
+        await self._send(self.page.mouse.up())
+
+    async def _on_window_bounds(self, command: Command) -> Dict[str, float]:
+        return await self.get_window_bounds()
+
+    async def _on_dispatch(self, command: Dispatch) -> Tuple[int, List[BaseException]]:
+        if self.dispatch_mode == "cdp" or command.pressed:
+            await self.get_cdp_session()
+        return await self._dispatch_async(command)
+
+    def _mouse_move(self, v: Vector) -> Awaitable:
+        return self.page.mouse.move(v.x, v.y)
+
+    def _cdp_move(self, v: Vector, pressed: bool) -> Awaitable:
+        # Playwright keeps the pressed button to itself, the CDP events are told
+        button = "left" if pressed else "none"
+        return self.cdp_session.send(
+            "Input.dispatchMouseEvent", mouse_moved_event(v, button)
         )
-        await self.trace_path(path(self.previous, to))
-
-        if overshooting:
-            bounding_box = {
-                "height": dimensions["height"],
-                "width": dimensions["width"],
-                "x": destination.x,
-                "y": destination.y,
-            }
-            correction = path(to, bounding_box, self.overshoot_spread)
-            await self.trace_path(correction)
-        self.previous = destination
-        self.toggle_random_move(True)
-
-    async def move_to(self, destination: dict):
-        destination_vector = Vector(destination["x"], destination["y"])
-        self.toggle_random_move(False)
-        await self.trace_path(path(self.previous, destination_vector))
-        self.toggle_random_move(True)
-
-
-def create_cursor(page, start: Union[Vector, Dict] = origin) -> GhostCursor:
+
+
+def create_cursor(
+    page,
+    start: Union[Vector, Dict] = origin,
+    perform_random_moves: bool = False,
+    rng: RandomSource = None,
+) -> GhostCursor:
     if isinstance(start, dict):
         start = Vector(**start)
-    cursor = GhostCursor(page, start)
-    # Can't seem to get random movement to work with Playwright.
-    # if perform_random_moves:
-    #   asyncio.ensure_future(cursor.random_move()) # fire and forget
+    cursor = GhostCursor(page, start, rng)
+    if perform_random_moves:
+        cursor.start_random_moves()
     return cursor
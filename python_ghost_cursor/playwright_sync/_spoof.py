@@ -1,80 +1,158 @@
 import asyncio
+import contextlib
 import logging
+import os
 import time
-import random
-from typing import Union, Optional, Dict, List
-from playwright.sync_api import Page, ElementHandle
-
-from python_ghost_cursor.shared._math import (
-    Vector,
-    origin,
-    overshoot,
+from typing import Any, Awaitable, Union, Optional, Dict, List, Iterable, Sequence, Tuple
+import numpy as np
+from playwright.sync_api import Page, ElementHandle, CDPSession
+
+from python_ghost_cursor.shared._math import Vector, origin, RandomSource
+from python_ghost_cursor.shared._dispatch import (
+    mouse_moved_event,
+    mouse_wheel_event,
+    collect_errors,
+)
+from python_ghost_cursor.shared._scroll import (
+    scroll_delta_script,
+    scroll_settle_script,
+    wheel_playback,
+)
+from python_ghost_cursor.shared._frames import (
+    content_offset_script,
+    scroll_position_script,
+)
+from python_ghost_cursor.shared._path import Path
+from python_ghost_cursor.shared._route import resolve_boxes_script
+from python_ghost_cursor.shared._keyboard import (
+    keystroke_playback,
+    defaultWpm,
+    defaultMistakes,
 )
-from python_ghost_cursor.shared._spoof import (
-    path,
-    should_overshoot,
-    get_random_box_point,
+from python_ghost_cursor.shared._box_cache import (
+    BoxCache,
+    binding,
+    observer_script,
+    settle_script,
+)
+from python_ghost_cursor.shared._core import (
+    CursorCore,
+    Command,
+    Plan,
+    drive,
+    drive_async,
+    WaitForSelector,
+    Find,
+    Scroll,
+    ScrollDelta,
+    WaitForScroll,
+    Wheel,
+    TypeKeys,
+    FrameOwner,
+    ScrollPosition,
+    ResolveBoxes,
+    GetBox,
+    ComputePath,
+    Dispatch,
+    Sleep,
 )
 
 
 logger = logging.getLogger(__name__)
 
 
-class GhostCursor:
-    def __init__(self, page: Page, start: Vector):
+class GhostCursor(CursorCore):
+    """Executes the plans of CursorCore on a Playwright page (sync API)"""
+
+    def __init__(self, page: Page, start: Vector, rng: RandomSource = None):
+        super().__init__(start, rng)
         self.page = page
-        self.previous = start
-        self.moving = False
-        self.overshoot_spread = 10
-        self.overshoot_radius = 120
-        self.cdp_session = page.context.new_cdp_session(page)
+        self._random_moves: Optional[asyncio.Task] = None
+
+    def _run(self, plan: Plan) -> Any:
+        return drive(plan, self._execute)
+
+    def _is_connected(self) -> bool:
+        # Persistent contexts have no browser object
+        browser = self.page.context.browser
+        return browser is None or browser.is_connected()
+
+    def get_cdp_session(self) -> CDPSession:
+        if not hasattr(self, "cdp_session"):
+            self.cdp_session = self.page.context.new_cdp_session(self.page)
+        return self.cdp_session
+
+    def get_window_bounds(self) -> Dict[str, float]:
+        """Get the size of the viewport, or of the browser window without one"""
+        if self.page.viewport_size is not None:
+            return self.page.viewport_size
+        # Without a targetId, the window of the session's own target
+        window = self.get_cdp_session().send("Browser.getWindowForTarget")
+        return window["bounds"]
 
     def get_random_page_point(self) -> Vector:
         """Get a random point on a browser window"""
-        target_id = self.page.target._targetId
-        window = self.cdp_session.send(
-            "Browser.getWindowForTarget", {"targetId": target_id}
-        )
-        return get_random_box_point(
-            {
-                "x": origin.x,
-                "y": origin.y,
-                "width": window["bounds"]["width"],
-                "height": window["bounds"]["height"],
-            }
-        )
+        return self._run(self._random_point_plan())
+
+    def start_random_moves(self) -> None:
+        """Move the mouse to random points in the background, until stop_random_moves.
+
+        The sync API has no event loop of its own: the moves run as a task on
+        Playwright's loop, with the async objects underneath the page, so they
+        only progress while a Playwright call (e.g. page.wait_for_timeout) is in
+        flight. Moves are skipped while the cursor is busy with a move of its own.
+        """
+        if self._random_moves is not None and not self._random_moves.done():
+            return
+        # Measured now, the task can't make sync calls
+        if self.window_bounds is None:
+            self.window_bounds = self.get_window_bounds()
+        self.get_cdp_session()
+        self._random_moves = self.page._loop.create_task(self._random_move_loop())
 
-    async def random_move(self):
-        """Start random mouse movements. Function recursively calls itself"""
+    def stop_random_moves(self) -> None:
+        task, self._random_moves = self._random_moves, None
+        if task is None or task.done():
+            return
+        task.cancel()
+
+        async def cancelled() -> None:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+        self.page._sync(cancelled())
+
+    def random_move(self) -> None:
+        """Start random mouse movements, same as start_random_moves"""
+        self.start_random_moves()
+
+    async def _random_move_loop(self) -> None:
         try:
-            if not self.moving:
-                rand = self.get_random_page_point()
-                self.trace_path(path(self.previous, rand), True)
-                self.previous = rand
-            await asyncio.sleep(random.random() * 2)
-            asyncio.ensure_future(
-                self.random_move()
-            )  # fire and forget, recursive function
-        except:
-            logger.debug("Warning: stopping random mouse movements")
-
-    def trace_path(self, vectors: List[Vector], abort_on_move: bool = False) -> None:
+            while await drive_async(self._random_move_plan(), self._execute_async):
+                if not self._is_connected():
+                    break
+            logger.debug("Warning: stopping random mouse movements, the page is gone")
+        except Exception as exc:
+            logger.debug(
+                "Warning: stopping random mouse movements, error message: %s", exc
+            )
+
+    async def _execute_async(self, command: Command) -> Any:
+        """Execute a command of the random moves, from Playwright's loop.
+
+        Commands without an async handler must not call the sync API, computing
+        paths is the only one the random moves need.
+        """
+        handler = getattr(self, command.handler + "_async", None)
+        if handler is None:
+            return self._execute(command)
+        return await handler(command)
+
+    def trace_path(
+        self, vectors: Iterable[Vector], abort_on_move: bool = False
+    ) -> None:
         """Move the mouse over a number of vectors"""
-        for v in vectors:
-            try:
-                # In case this is called from random mouse movements and the users wants to move the mouse, abort
-                if abort_on_move and self.moving:
-                    return
-                self.page.mouse.move(v.x, v.y)
-                self.previous = v
-            except Exception as exc:
-                # Exit function if the browser is no longer connected
-                if not self.page.browser.is_connected():
-                    return
-                logger.debug("Warning: could not move mouse, error message: %s", exc)
-
-    def toggle_random_move(self, random_: bool):
-        self.moving = not random_
+        self._run(self._trace_plan(vectors, abort_on_move))
 
     def click(
         self,
@@ -83,84 +161,292 @@ class GhostCursor:
         wait_for_selector: Optional[float] = None,
         wait_for_click: Optional[float] = None,
     ) -> None:
-        self.toggle_random_move(False)
-        if selector is not None:
-            self.move(selector, padding_percentage, wait_for_selector)
-            self.toggle_random_move(False)
+        self._run(
+            self._click_plan(
+                selector, padding_percentage, wait_for_selector, wait_for_click
+            )
+        )
 
-        try:
-            self.page.mouse.down()
-            if wait_for_click is not None:
-                time.sleep(wait_for_click / 1000)
-            self.page.mouse.up()
-        except Exception as exc:
-            logger.debug("Warning: could not click mouse, error message: %s", exc)
+    def move(
+        self,
+        selector: Union[str, ElementHandle],
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+    ) -> None:
+        self._run(self._move_plan(selector, padding_percentage, wait_for_selector))
 
-        time.sleep(random.random() * 2)
-        self.toggle_random_move(True)
+    def click_sequence(
+        self,
+        selectors: Sequence[str],
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+        wait_for_click: Optional[float] = None,
+    ) -> None:
+        """Click CSS or XPath selectors in order.
 
-    def move(
+        The boxes of all the targets are fetched in one call and the whole route,
+        overshoots included, is planned before the first move.
+        """
+        self._run(
+            self._click_sequence_plan(
+                selectors, padding_percentage, wait_for_selector, wait_for_click
+            )
+        )
+
+    def plan_route(
+        self,
+        selectors: Sequence[str],
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+    ) -> List[Path]:
+        """Get the paths visiting selectors in order from the mouse position, without moving"""
+        route = self._run(
+            self._route_plan(selectors, padding_percentage, wait_for_selector)
+        )
+        return [points for _, _, points in route]
+
+    def replay(
+        self, records: Union[np.ndarray, str, os.PathLike], realtime: bool = True
+    ) -> None:
+        """Play back recorded or captured trajectories, see TrajectoryRecorder.
+
+        records is a trajectory log file or its records. When realtime, the
+        recorded timing is kept, otherwise the points are sent as fast as possible.
+        """
+        self._run(self._replay_plan(records, realtime))
+
+    def scroll_to(
         self,
         selector: Union[str, ElementHandle],
+        wait_for_selector: Optional[float] = None,
+    ) -> None:
+        """Scroll selector into view with wheel ticks, speeding up and slowing down like a human"""
+        self._run(self._scroll_to_plan(selector, wait_for_selector))
+
+    def type(
+        self,
+        selector: Optional[Union[str, ElementHandle]],
+        text: str,
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+        wpm: float = defaultWpm,
+        mistakes: float = defaultMistakes,
+    ) -> None:
+        """Click selector, then type text with human timing and the odd corrected typo.
+
+        Pass None as selector to type where the focus is. The key events are
+        planned at once from the cursor's generator and pipelined over CDP.
+        """
+        self._run(
+            self._type_plan(
+                selector, text, padding_percentage, wait_for_selector, wpm, mistakes
+            )
+        )
+
+    def drag(
+        self,
+        source: Union[str, ElementHandle],
+        target: Union[str, ElementHandle, Dict, Vector],
         padding_percentage: Optional[float] = None,
         wait_for_selector: Optional[float] = None,
+        hold: Optional[float] = None,
+        density: float = 1.0,
     ) -> None:
-        self.toggle_random_move(False)
-        elem = None
-        if isinstance(selector, str):
-            if wait_for_selector:
-                self.page.wait_for_selector(selector, timeout=wait_for_selector)
-            elem = self.page.query_selector(selector)
-            if elem is None:
-                raise Exception(
-                    'Could not find element with selector "${}", make sure you\'re waiting for the elements with "puppeteer.wait_for_selector"'.format(
-                        selector
+        """Drag source onto target, an element or a point.
+
+        The moves with the button held are pipelined over CDP. hold is the pause
+        in milliseconds after the press and before the release, density scales
+        the number of points of the path.
+        """
+        self._run(
+            self._drag_plan(
+                source, target, padding_percentage, wait_for_selector, hold, density
+            )
+        )
+
+    def move_to(self, destination: dict, frame: Any = None) -> None:
+        """Move to a point, relative to frame's viewport when frame is given"""
+        self._run(self._move_to_plan(destination, frame))
+
+    def frame_offset(self, frame: Any) -> Vector:
+        """Get where the content of frame starts in the page's viewport, cached per frame"""
+        return self._run(self._frame_offset_plan(frame))
+
+    def enable_box_cache(self) -> None:
+        """Cache element boxes between moves, until the page reports a layout change"""
+        if self.box_cache is not None:
+            return
+        self.box_cache = BoxCache()
+        self.page.expose_binding(binding, lambda source: self.box_cache.changed())
+        script = observer_script()
+        self.page.add_init_script(script)
+        self.page.evaluate(script)
+        self._watch_frames()
+
+    def _watch_frames(self) -> None:
+        """Drop cached geometry when frames navigate or are detached"""
+        if self._watching_frames:
+            return
+        self._watching_frames = True
+        self.page.on("framenavigated", self._on_frame_navigated)
+        self.page.on("framedetached", self.frame_offsets.invalidate)
+
+    def _on_frame_navigated(self, frame) -> None:
+        self.frame_offsets.invalidate(frame)
+        if self.box_cache is not None and frame == self.page.main_frame:
+            self.box_cache.clear()
+
+    # Command handlers
+
+    def _on_wait_for_selector(self, command: WaitForSelector) -> None:
+        self.page.wait_for_selector(command.selector, timeout=command.timeout)
+
+    def _on_find(self, command: Find) -> Optional[ElementHandle]:
+        return self.page.query_selector(command.selector)
+
+    def _on_scroll(self, command: Scroll) -> None:
+        command.element.scroll_into_view_if_needed()
+
+    def _on_scroll_delta(self, command: ScrollDelta) -> List[float]:
+        return command.element.evaluate(scroll_delta_script)
+
+    def _on_wait_for_scroll(self, command: WaitForScroll) -> None:
+        self.page.evaluate(scroll_settle_script, command.timeout)
+
+    def _on_wheel(self, command: Wheel) -> Tuple[int, List[BaseException]]:
+        # Paced on Playwright's event loop, like paths
+        cdp_session = self.get_cdp_session()._impl_obj
+
+        async def scroll() -> List:
+            pending = []
+            for delay, delta_x, delta_y in wheel_playback(
+                command.deltas, command.timestamps
+            ):
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                pending.append(
+                    asyncio.ensure_future(
+                        cdp_session.send(
+                            "Input.dispatchMouseEvent",
+                            mouse_wheel_event(command.position, delta_x, delta_y),
+                        )
                     )
                 )
-        else:  # ElementHandle
-            elem = selector
-
-        # Make sure the object is in view
-        elem.scroll_into_view_if_needed()
-        box = elem.bounding_box()
-        if box is None:
-            raise Exception(
-                "Could not find the dimensions of the element you're clicking on, this might be a bug?"
-            )
-        destination = get_random_box_point(box, padding_percentage)
-        dimensions = {"height": box["height"], "width": box["width"]}
-        overshooting = should_overshoot(self.previous, destination)
-        to = (
-            overshoot(destination, self.overshoot_radius)
-            if overshooting
-            else destination
+            return await asyncio.gather(*pending, return_exceptions=True)
+
+        results = self.page._sync(scroll())
+        return len(results), collect_errors(results)
+
+    def _on_type_keys(self, command: TypeKeys) -> Tuple[int, List[BaseException]]:
+        # Paced on Playwright's event loop, like paths
+        cdp_session = self.get_cdp_session()._impl_obj
+
+        async def type_keys() -> List:
+            pending = []
+            for delay, event in keystroke_playback(command.timestamps, command.events):
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                pending.append(
+                    asyncio.ensure_future(
+                        cdp_session.send("Input.dispatchKeyEvent", event)
+                    )
+                )
+            return await asyncio.gather(*pending, return_exceptions=True)
+
+        results = self.page._sync(type_keys())
+        return len(results), collect_errors(results)
+
+    def _on_frame_owner(
+        self, command: FrameOwner
+    ) -> Tuple[Any, Optional[Vector]]:
+        self._watch_frames()
+        parent = command.frame.parent_frame
+        if parent is None:
+            return None, None
+        x, y = command.frame.frame_element().evaluate(content_offset_script)
+        return parent, Vector(x, y)
+
+    def _on_scroll_position(self, command: ScrollPosition) -> Vector:
+        x, y = self.page.evaluate(scroll_position_script)
+        return Vector(x, y)
+
+    def _on_settle(self, command: Command) -> None:
+        self.page.evaluate(settle_script)
+
+    def _on_poll_events(self, command: Command) -> None:
+        # Let Playwright's loop deliver layout changes the page already reported
+        self.page._sync(asyncio.sleep(0))
+
+    def _on_resolve_boxes(self, command: ResolveBoxes) -> Dict[str, Any]:
+        return self.page.evaluate(resolve_boxes_script, command.selectors)
+
+    def _on_get_box(self, command: GetBox) -> Optional[Dict[str, float]]:
+        return command.element.bounding_box()
+
+    def _on_compute_path(self, command: ComputePath) -> Iterable[Vector]:
+        return self._path_inline(
+            command.start, command.end, command.spread_override, command.density
         )
-        self.trace_path(path(self.previous, to))
-
-        if overshooting:
-            bounding_box = {
-                "height": dimensions["height"],
-                "width": dimensions["width"],
-                "x": destination.x,
-                "y": destination.y,
-            }
-            correction = path(to, bounding_box, self.overshoot_spread)
-            self.trace_path(correction)
-        self.previous = destination
-        self.toggle_random_move(True)
-
-    def move_to(self, destination: dict) -> None:
-        destination_vector = Vector(destination["x"], destination["y"])
-        self.toggle_random_move(False)
-        self.trace_path(path(self.previous, destination_vector))
-        self.toggle_random_move(True)
-
-
-def create_cursor(page, start: Union[Vector, Dict] = origin) -> GhostCursor:
+
+    def _on_mouse_down(self, command: Command) -> None:
+        self.page.mouse.down()
+
+    def _on_mouse_up(self, command: Command) -> None:
+        self.page.mouse.up()
+
+    def _on_sleep(self, command: Sleep) -> None:
+        time.sleep(command.seconds)
+
+    def _on_window_bounds(self, command: Command) -> Dict[str, float]:
+        return self.get_window_bounds()
+
+    async def _on_window_bounds_async(self, command: Command) -> Dict[str, float]:
+        # window_bounds was reset while random moves run on Playwright's loop
+        page = self.page._impl_obj
+        if page.viewport_size is not None:
+            return page.viewport_size
+        if hasattr(self, "cdp_session"):
+            cdp_session = self.cdp_session._impl_obj
+        else:
+            cdp_session = await page.context.new_cdp_session(page)
+        window = await cdp_session.send("Browser.getWindowForTarget")
+        return window["bounds"]
+
+    async def _on_sleep_async(self, command: Sleep) -> None:
+        await asyncio.sleep(command.seconds)
+
+    async def _on_dispatch_async(
+        self, command: Dispatch
+    ) -> Tuple[int, List[BaseException]]:
+        return await self._dispatch_async(command)
+
+    def _on_dispatch(self, command: Dispatch) -> Tuple[int, List[BaseException]]:
+        if self.dispatch_mode == "cdp" or command.pressed:
+            self.get_cdp_session()
+        # The sync API waits for every call, so the path is sent with the async
+        # implementation objects underneath it, on Playwright's own event loop
+        return self.page._sync(self._dispatch_async(command))
+
+    def _mouse_move(self, v: Vector) -> Awaitable:
+        return self.page.mouse._impl_obj.move(v.x, v.y)
+
+    def _cdp_move(self, v: Vector, pressed: bool) -> Awaitable:
+        # Playwright keeps the pressed button to itself, the CDP events are told
+        button = "left" if pressed else "none"
+        return self.cdp_session._impl_obj.send(
+            "Input.dispatchMouseEvent", mouse_moved_event(v, button)
+        )
+
+
+def create_cursor(
+    page,
+    start: Union[Vector, Dict] = origin,
+    perform_random_moves: bool = False,
+    rng: RandomSource = None,
+) -> GhostCursor:
     if isinstance(start, dict):
         start = Vector(**start)
-    cursor = GhostCursor(page, start)
-    # Can't seem to get random movement to work with Playwright.
-    # if perform_random_moves:
-    #   asyncio.ensure_future(cursor.random_move()) # fire and forget
+    cursor = GhostCursor(page, start, rng)
+    if perform_random_moves:
+        cursor.start_random_moves()
     return cursor
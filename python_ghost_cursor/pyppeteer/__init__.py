@@ -1,4 +1,22 @@
-from ._spoof import create_cursor
-from ._mouse_helper import install_mouse_helper
+import importlib
+
+# Loaded on first access (PEP 562), install_mouse_helper does not need NumPy
+_lazy = {
+    "create_cursor": "._spoof",
+    "install_mouse_helper": "._mouse_helper",
+}
+
+
+def __getattr__(name):
+    if name not in _lazy:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(_lazy[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy))
+
 
 __all__ = ["create_cursor", "install_mouse_helper"]
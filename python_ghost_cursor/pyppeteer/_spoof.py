@@ -1,7 +1,16 @@
 import asyncio
 import logging
-import random
-from typing import Union, Coroutine, Optional, Dict, List
+from typing import (
+    Any,
+    Awaitable,
+    Union,
+    Coroutine,
+    Optional,
+    Dict,
+    List,
+    Iterable,
+    Tuple,
+)
 from pyppeteer.page import Page
 
 try:
@@ -13,37 +22,87 @@ except ModuleNotFoundError:
     # https://github.com/pyppeteer/pyppeteer/blob/dev/pyppeteer/element_handle.py
     from pyppeteer.element_handle import ElementHandle
 
-from python_ghost_cursor.shared._math import (
-    Vector,
-    origin,
-    overshoot,
+from python_ghost_cursor.shared._math import Vector, origin, RandomSource
+from python_ghost_cursor.shared._spoof import get_random_box_point
+from python_ghost_cursor.shared._dispatch import (
+    mouse_moved_event,
+    mouse_wheel_event,
+    collect_errors,
+)
+from python_ghost_cursor.shared._scroll import (
+    scroll_delta_script,
+    scroll_settle_script,
+    wheel_playback,
+)
+from python_ghost_cursor.shared._frames import scroll_position_script
+from python_ghost_cursor.shared._route import resolve_boxes_script
+from python_ghost_cursor.shared._keyboard import keystroke_playback
+from python_ghost_cursor.shared._box_cache import (
+    BoxCache,
+    binding,
+    observer_script,
+    settle_script,
 )
-from python_ghost_cursor.shared._spoof import (
-    path,
-    should_overshoot,
-    get_random_box_point,
+from python_ghost_cursor.shared._async import AsyncCursor
+from python_ghost_cursor.shared._core import (
+    Command,
+    WaitForSelector,
+    Find,
+    Scroll,
+    ScrollDelta,
+    WaitForScroll,
+    Wheel,
+    TypeKeys,
+    FrameOwner,
+    ScrollPosition,
+    ResolveBoxes,
+    GetBox,
+    ComputePath,
+    Dispatch,
 )
 
 
 logger = logging.getLogger(__name__)
 
 
-async def get_random_page_point(page: Page) -> Coroutine[None, None, Vector]:
-    """Get a random point on a browser window"""
+async def get_window_bounds(page: Page) -> Coroutine[None, None, Dict[str, float]]:
+    """Get the position and size of the browser window"""
     target_id = page.target._targetId
     window = await page._client.send(
         "Browser.getWindowForTarget", {"targetId": target_id}
     )
+    return window["bounds"]
+
+
+async def get_random_page_point(
+    page: Page, rng: RandomSource = None
+) -> Coroutine[None, None, Vector]:
+    """Get a random point on a browser window"""
+    bounds = await get_window_bounds(page)
     return get_random_box_point(
         {
             "x": origin.x,
             "y": origin.y,
-            "width": window["bounds"]["width"],
-            "height": window["bounds"]["height"],
-        }
+            "width": bounds["width"],
+            "height": bounds["height"],
+        },
+        rng=rng,
     )
 
 
+async def get_frame_offset(page: Page, frame) -> Coroutine[None, None, Vector]:
+    """Get where the content of frame starts in the main frame's viewport"""
+    if frame is None or frame.parentFrame is None:
+        return origin
+    owner = await page._client.send("DOM.getFrameOwner", {"frameId": frame._id})
+    # The content quad is in the main frame's viewport, whatever the nesting
+    model = await page._client.send(
+        "DOM.getBoxModel", {"backendNodeId": owner["backendNodeId"]}
+    )
+    content = model["model"]["content"]
+    return Vector(content[0], content[1])
+
+
 async def get_element_box(
     page: Page, element: ElementHandle, relative_to_main_frame: bool = True
 ) -> Coroutine[None, None, Optional[Dict[str, float]]]:
@@ -67,122 +126,61 @@ async def get_element_box(
         "width": quads["quads"][0][4] - quads["quads"][0][0],
         "height": quads["quads"][0][5] - quads["quads"][0][1],
     }
-    if element_box is None:
-        return None
     if not relative_to_main_frame:
-        element_frame = element.executionContext.frame
-        parent_frame = await element_frame.parent_frame
-        frame = None
-        if parent_frame:
-            iframes = parent_frame.xpath("//iframe")
-            for iframe in iframes:
-                if (await iframe.contentFrame()) == element_frame:
-                    frame = iframe
-        if frame is not None:
-            bounding_box = await frame.boundingBox()
-            element_box.x = (
-                element_box.x - bounding_box.x
-                if bounding_box is not None
-                else element_box.x
-            )
-            element_box.y = (
-                element_box.y - bounding_box.y
-                if bounding_box is not None
-                else element_box.y
-            )
+        offset = await get_frame_offset(page, element.executionContext.frame)
+        element_box["x"] -= offset.x
+        element_box["y"] -= offset.y
     return element_box
 
 
-class GhostCursor:
-    def __init__(self, page: Page, start: Vector):
-        self.page = page
-        self.previous = start
-        self.moving = False
-        self.overshoot_spread = 10
-        self.overshoot_radius = 120
-
-    async def random_move(self):
-        """Start random mouse movements. Function recursively calls itself"""
-        try:
-            if not self.moving:
-                rand = await get_random_page_point(self.page)
-                await self.trace_path(path(self.previous, rand), True)
-                self.previous = rand
-            await asyncio.sleep(random.random() * 2)
-            asyncio.ensure_future(
-                self.random_move()
-            )  # fire and forget, recursive function
-        except:
-            logger.debug("Warning: stopping random mouse movements")
-
-    async def trace_path(self, vectors: List[Vector], abort_on_move: bool = False):
-        """Move the mouse over a number of vectors"""
-        for v in vectors:
-            try:
-                # In case this is called from random mouse movements and the users wants to move the mouse, abort
-                if abort_on_move and self.moving:
-                    return
-                await self.page.mouse.move(v.x, v.y)
-                self.previous = v
-            except Exception as exc:
-                # Exit function if the browser is no longer connected
-                if not self.page.browser.isConnected:
-                    return
-                logger.debug("Warning: could not move mouse, error message: %s", exc)
-
-    def toggle_random_move(self, random_: bool) -> None:
-        self.moving = not random_
-
-    async def click(
-        self,
-        selector: Optional[Union[str, ElementHandle]],
-        padding_percentage: Optional[float] = None,
-        wait_for_selector: Optional[float] = None,
-        wait_for_click: Optional[float] = None,
-    ):
-        self.toggle_random_move(False)
-        if selector is not None:
-            await self.move(selector, padding_percentage, wait_for_selector)
-            self.toggle_random_move(False)
-
-        try:
-            await self.page.mouse.down()
-            if wait_for_click is not None:
-                await asyncio.sleep(wait_for_click / 1000)
-            await self.page.mouse.up()
-        except Exception as exc:
-            logger.debug("Warning: could not click mouse, error message: %s", exc)
-
-        await asyncio.sleep(random.random() * 2)
-        self.toggle_random_move(True)
-
-    async def move(
-        self,
-        selector: Union[str, ElementHandle],
-        padding_percentage: Optional[float] = None,
-        wait_for_selector: Optional[float] = None,
-    ):
-        self.toggle_random_move(False)
-        elem = None
+class GhostCursor(AsyncCursor):
+    """Executes the plans of CursorCore on a pyppeteer page"""
+
+    wait_for_selector_hint = "puppeteer.waitForSelector"
+
+    def _main_frame(self) -> Any:
+        return self.page.mainFrame
+
+    def _is_connected(self) -> bool:
+        return self.page.browser.isConnected()
+
+    def _box_key(self, selector: Union[str, ElementHandle]) -> Any:
         if isinstance(selector, str):
-            if "//" in selector:
-                if wait_for_selector:
-                    await self.page.waitForXpath(selector, timeout=wait_for_selector)
-                elem = (await self.page.xpath(selector))[0]
-            else:
-                if wait_for_selector:
-                    await self.page.waitForSelector(selector, timeout=wait_for_selector)
-                elem = await self.page.querySelector(selector)
-            if elem is None:
-                raise Exception(
-                    'Could not find element with selector "${}", make sure you\'re waiting for the elements with "puppeteer.waitForSelector"'.format(
-                        selector
-                    )
-                )
-        else:  # ElementHandle
-            elem = selector
+            return selector
+        return selector._remoteObject.get("objectId")
+
+    async def moveTo(self, destination: dict, frame: Any = None):
+        """Move to a point, relative to frame's viewport when frame is given"""
+        await self._run(self._move_to_plan(destination, frame))
+
+    async def enable_box_cache(self) -> None:
+        """Cache element boxes between moves, until the page reports a layout change"""
+        if self.box_cache is not None:
+            return
+        self.box_cache = BoxCache()
+        await self.page.exposeFunction(binding, self.box_cache.changed)
+        script = observer_script()
+        await self.page.evaluateOnNewDocument(
+            "() => {" + script + "}"
+        )  # Concat here because Pyppeteer takes this arg as an anonymous function.
+        await self.page.evaluate(script, force_expr=True)
+        self._watch_frames()
 
-        # Make sure the object is in view
+    # Command handlers
+
+    async def _on_wait_for_selector(self, command: WaitForSelector) -> None:
+        if "//" in command.selector:
+            await self.page.waitForXpath(command.selector, timeout=command.timeout)
+        else:
+            await self.page.waitForSelector(command.selector, timeout=command.timeout)
+
+    async def _on_find(self, command: Find) -> Optional[ElementHandle]:
+        if "//" in command.selector:
+            return (await self.page.xpath(command.selector))[0]
+        return await self.page.querySelector(command.selector)
+
+    async def _on_scroll(self, command: Scroll) -> None:
+        elem = command.element
         if hasattr(elem, "_remoteObject") and "objectId" in elem._remoteObject:
             try:
                 await self.page._client.send(
@@ -193,47 +191,100 @@ class GhostCursor:
                 await self.page.evaluate(
                     "e => e.scrollIntoView()", elem
                 )  # use regular JS scroll method as a fallback (use Page.evaluate for backwards compatibility)
-        box = await get_element_box(self.page, elem)
-        if box is None:
-            raise Exception(
-                "Could not find the dimensions of the element you're clicking on, this might be a bug?"
+
+    async def _on_scroll_delta(self, command: ScrollDelta) -> List[float]:
+        return await self.page.evaluate(scroll_delta_script, command.element)
+
+    async def _on_wait_for_scroll(self, command: WaitForScroll) -> None:
+        await self.page.evaluate(scroll_settle_script, command.timeout)
+
+    async def _on_wheel(self, command: Wheel) -> Tuple[int, List[BaseException]]:
+        modifiers = self.page.mouse._keyboard._modifiers
+        pending = []
+        for delay, delta_x, delta_y in wheel_playback(
+            command.deltas, command.timestamps
+        ):
+            if delay > 0:
+                await asyncio.sleep(delay)
+            pending.append(
+                self.page._client.send(
+                    "Input.dispatchMouseEvent",
+                    mouse_wheel_event(command.position, delta_x, delta_y, modifiers),
+                )
             )
-        destination = get_random_box_point(box, padding_percentage)
-        dimensions = {"height": box["height"], "width": box["width"]}
-        overshooting = should_overshoot(self.previous, destination)
-        to = (
-            overshoot(destination, self.overshoot_radius)
-            if overshooting
-            else destination
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        return len(pending), collect_errors(results)
+
+    async def _on_type_keys(self, command: TypeKeys) -> Tuple[int, List[BaseException]]:
+        pending = []
+        for delay, event in keystroke_playback(command.timestamps, command.events):
+            if delay > 0:
+                await asyncio.sleep(delay)
+            pending.append(self.page._client.send("Input.dispatchKeyEvent", event))
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        return len(pending), collect_errors(results)
+
+    async def _on_frame_owner(
+        self, command: FrameOwner
+    ) -> Tuple[Any, Optional[Vector]]:
+        self._watch_frames()
+        if command.frame.parentFrame is None:
+            return None, None
+        return None, await get_frame_offset(self.page, command.frame)
+
+    async def _on_scroll_position(self, command: ScrollPosition) -> Vector:
+        x, y = await self.page.evaluate(scroll_position_script)
+        return Vector(x, y)
+
+    async def _on_settle(self, command: Command) -> None:
+        await self.page.evaluate(settle_script)
+
+    async def _on_resolve_boxes(self, command: ResolveBoxes) -> Dict[str, Any]:
+        return await self.page.evaluate(resolve_boxes_script, command.selectors)
+
+    async def _on_get_box(self, command: GetBox) -> Optional[Dict[str, float]]:
+        return await get_element_box(self.page, command.element)
+
+    async def _on_compute_path(self, command: ComputePath) -> Iterable[Vector]:
+        return self._path_inline(
+            command.start, command.end, command.spread_override, command.density
+        )
+
+    async def _on_mouse_down(self, command: Command) -> None:
+        await self.page.mouse.down()
+
+    async def _on_mouse_up(self, command: Command) -> None:
+        await self.page.mouse.up()
+
+    async def _on_window_bounds(self, command: Command) -> Dict[str, float]:
+        return await get_window_bounds(self.page)
+
+    async def _on_dispatch(self, command: Dispatch) -> Tuple[int, List[BaseException]]:
+        return await self._dispatch_async(command)
+
+    def _mouse_move(self, v: Vector) -> Awaitable:
+        return self.page.mouse.move(v.x, v.y)
+
+    def _cdp_move(self, v: Vector, pressed: bool) -> Awaitable:
+        # pyppeteer's mouse knows which button is down, the CDP events carry it.
+        # Keep its position in sync, down() and up() are sent there
+        mouse = self.page.mouse
+        mouse._x, mouse._y = v.x, v.y
+        return self.page._client.send(
+            "Input.dispatchMouseEvent",
+            mouse_moved_event(v, mouse._button, mouse._keyboard._modifiers),
         )
-        await self.trace_path(path(self.previous, to))
-
-        if overshooting:
-            bounding_box = {
-                "height": dimensions["height"],
-                "width": dimensions["width"],
-                "x": destination.x,
-                "y": destination.y,
-            }
-            correction = path(to, bounding_box, self.overshoot_spread)
-            await self.trace_path(correction)
-        self.previous = destination
-        self.toggle_random_move(True)
-
-    async def moveTo(self, destination: dict):
-        destination_vector = Vector(destination["x"], destination["y"])
-        self.toggle_random_move(False)
-        await self.trace_path(path(self.previous, destination_vector))
-        self.toggle_random_move(True)
 
 
 def create_cursor(
-    page, start: Union[Vector, Dict] = origin, perform_random_moves: bool = False
+    page,
+    start: Union[Vector, Dict] = origin,
+    perform_random_moves: bool = False,
+    rng: RandomSource = None,
 ) -> GhostCursor:
     if isinstance(start, dict):
         start = Vector(**start)
-    cursor = GhostCursor(page, start)
+    cursor = GhostCursor(page, start, rng)
     if perform_random_moves:
-        # Start random mouse movements. Do not await the promise but return immediately
-        asyncio.ensure_future(cursor.random_move())  # fire and forget
+        cursor.start_random_moves()
     return cursor
@@ -0,0 +1,64 @@
+import math
+import numpy as np
+from typing import Optional, Sequence, Union
+from python_ghost_cursor.shared._math import Vector, clamp
+from python_ghost_cursor.shared._path import Path
+from python_ghost_cursor.shared._timing import as_points, resample_path
+
+# Time a browser takes to handle one mouse move at density 1, in seconds: about
+# a 120 Hz mouse. Slower dispatch lowers the density, faster dispatch raises it
+targetInterval = 0.008
+# Realism bounds: paths keep between a quarter and twice their points, and never
+# fewer than minPoints
+minDensity = 0.25
+maxDensity = 2.0
+minPoints = 5
+# Weight of the newest sample in the rolling average of the dispatch time
+smoothing = 0.2
+
+
+class AdaptiveDensity:
+    """Scale the number of points of paths to how long the browser takes to take them.
+
+    Assign an instance to cursor.adaptive_density. The cursor reports the time
+    spent per point of every path it dispatches (the round trip time of
+    page.mouse.move, or its share of a pipelined batch), and density follows the
+    rolling average: targetInterval / seconds per point, within minDensity and
+    maxDensity. Paths are then resampled along their arc length to density times
+    their points, so a remote browser gets short, coarse moves and a local one
+    smooth ones. Paced (realtime) dispatches are not measured.
+    """
+
+    def __init__(
+        self,
+        target_interval: float = targetInterval,
+        min_density: float = minDensity,
+        max_density: float = maxDensity,
+    ):
+        self.target_interval = target_interval
+        self.min_density = min_density
+        self.max_density = max_density
+        self.density = 1.0
+        # Rolling average of the seconds per dispatched point, None before the first path
+        self.seconds_per_point: Optional[float] = None
+
+    def observe(self, seconds: float, points: int) -> None:
+        """Report that dispatching points took seconds"""
+        if points <= 0:
+            return
+        sample = seconds / points
+        if self.seconds_per_point is None:
+            self.seconds_per_point = sample
+        else:
+            self.seconds_per_point += smoothing * (sample - self.seconds_per_point)
+        self.density = clamp(
+            self.target_interval / max(self.seconds_per_point, 1e-9),
+            self.min_density,
+            self.max_density,
+        )
+
+    def resample(self, vectors: Union[np.ndarray, Sequence[Vector]]) -> Path:
+        """Resample a path to the current density"""
+        points = as_points(vectors)
+        count = max(min(minPoints, len(points)), math.ceil(len(points) * self.density))
+        return Path(resample_path(points, count))
@@ -0,0 +1,214 @@
+"""Public API of the asyncio backends.
+
+AsyncCursor runs the plans of CursorCore with drive_async and owns the random
+moves task. The GhostCursor of pyppeteer and of the async Playwright API only
+add the command handlers that talk to their page.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+from abc import abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+import numpy as np
+
+from python_ghost_cursor.shared._math import Vector, RandomSource
+from python_ghost_cursor.shared._path import Path
+from python_ghost_cursor.shared._keyboard import defaultWpm, defaultMistakes
+from python_ghost_cursor.shared._core import (
+    CursorCore,
+    Command,
+    Plan,
+    drive_async,
+    Sleep,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCursor(CursorCore):
+    """Runs the plans of CursorCore on the event loop, see GhostCursor of each backend"""
+
+    def __init__(self, page: Any, start: Vector, rng: RandomSource = None):
+        super().__init__(start, rng)
+        self.page = page
+        self._random_moves: Optional[asyncio.Task] = None
+
+    async def _run(self, plan: Plan) -> Any:
+        return await drive_async(plan, self._execute)
+
+    @abstractmethod
+    def _main_frame(self) -> Any:
+        """The page's main frame"""
+
+    def start_random_moves(self) -> None:
+        """Move the mouse to random points in a background task, until stop_random_moves.
+
+        Moves are skipped while the cursor is busy with a move of its own. The task
+        stops by itself when a move fails, e.g. once the page is closed.
+        """
+        if self._random_moves is None or self._random_moves.done():
+            self._random_moves = asyncio.ensure_future(self._random_move_loop())
+
+    async def stop_random_moves(self) -> None:
+        task, self._random_moves = self._random_moves, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def random_move(self):
+        """Start random mouse movements, same as start_random_moves"""
+        self.start_random_moves()
+
+    async def _random_move_loop(self) -> None:
+        try:
+            while await self._run(self._random_move_plan()):
+                if not self._is_connected():
+                    break
+            logger.debug("Warning: stopping random mouse movements, the page is gone")
+        except Exception as exc:
+            logger.debug(
+                "Warning: stopping random mouse movements, error message: %s", exc
+            )
+
+    async def trace_path(self, vectors: Iterable[Vector], abort_on_move: bool = False):
+        """Move the mouse over a number of vectors"""
+        await self._run(self._trace_plan(vectors, abort_on_move))
+
+    async def click(
+        self,
+        selector: Optional[Union[str, Any]],
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+        wait_for_click: Optional[float] = None,
+    ):
+        await self._run(
+            self._click_plan(
+                selector, padding_percentage, wait_for_selector, wait_for_click
+            )
+        )
+
+    async def move(
+        self,
+        selector: Union[str, Any],
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+    ):
+        await self._run(self._move_plan(selector, padding_percentage, wait_for_selector))
+
+    async def click_sequence(
+        self,
+        selectors: Sequence[str],
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+        wait_for_click: Optional[float] = None,
+    ):
+        """Click CSS or XPath selectors in order.
+
+        The boxes of all the targets are fetched in one call and the whole route,
+        overshoots included, is planned before the first move.
+        """
+        await self._run(
+            self._click_sequence_plan(
+                selectors, padding_percentage, wait_for_selector, wait_for_click
+            )
+        )
+
+    async def plan_route(
+        self,
+        selectors: Sequence[str],
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+    ) -> List[Path]:
+        """Get the paths visiting selectors in order from the mouse position, without moving"""
+        route = await self._run(
+            self._route_plan(selectors, padding_percentage, wait_for_selector)
+        )
+        return [points for _, _, points in route]
+
+    async def replay(
+        self, records: Union[np.ndarray, str, os.PathLike], realtime: bool = True
+    ) -> None:
+        """Play back recorded or captured trajectories, see TrajectoryRecorder.
+
+        records is a trajectory log file or its records. When realtime, the
+        recorded timing is kept, otherwise the points are sent as fast as possible.
+        """
+        await self._run(self._replay_plan(records, realtime))
+
+    async def scroll_to(
+        self,
+        selector: Union[str, Any],
+        wait_for_selector: Optional[float] = None,
+    ):
+        """Scroll selector into view with wheel ticks, speeding up and slowing down like a human"""
+        await self._run(self._scroll_to_plan(selector, wait_for_selector))
+
+    async def type(
+        self,
+        selector: Optional[Union[str, Any]],
+        text: str,
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+        wpm: float = defaultWpm,
+        mistakes: float = defaultMistakes,
+    ):
+        """Click selector, then type text with human timing and the odd corrected typo.
+
+        Pass None as selector to type where the focus is. The key events are
+        planned at once from the cursor's generator and pipelined over CDP.
+        """
+        await self._run(
+            self._type_plan(
+                selector, text, padding_percentage, wait_for_selector, wpm, mistakes
+            )
+        )
+
+    async def drag(
+        self,
+        source: Union[str, Any],
+        target: Union[str, Any, Dict, Vector],
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+        hold: Optional[float] = None,
+        density: float = 1.0,
+    ):
+        """Drag source onto target, an element or a point.
+
+        The moves with the button held are pipelined over CDP. hold is the pause
+        in milliseconds after the press and before the release, density scales
+        the number of points of the path.
+        """
+        await self._run(
+            self._drag_plan(
+                source, target, padding_percentage, wait_for_selector, hold, density
+            )
+        )
+
+    async def frame_offset(self, frame: Any) -> Vector:
+        """Get where the content of frame starts in the page's viewport, cached per frame"""
+        return await self._run(self._frame_offset_plan(frame))
+
+    def _watch_frames(self) -> None:
+        """Drop cached geometry when frames navigate or are detached"""
+        if self._watching_frames:
+            return
+        self._watching_frames = True
+        self.page.on("framenavigated", self._on_frame_navigated)
+        self.page.on("framedetached", self.frame_offsets.invalidate)
+
+    def _on_frame_navigated(self, frame) -> None:
+        self.frame_offsets.invalidate(frame)
+        if self.box_cache is not None and frame == self._main_frame():
+            self.box_cache.clear()
+
+    # Command handlers that do not touch the page
+
+    async def _on_poll_events(self, command: Command) -> None:
+        # Let the loop run the callbacks of layout changes the page already reported
+        await asyncio.sleep(0)
+
+    async def _on_sleep(self, command: Sleep) -> None:
+        await asyncio.sleep(command.seconds)
@@ -0,0 +1,53 @@
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Page function exposed to the observer script, called on every layout change
+binding = "__ghostCursorLayoutChanged"
+
+# Wait for pending scroll events to be dispatched and reported
+settle_script = """() => new Promise(resolve => {
+    requestAnimationFrame(resolve)
+    setTimeout(resolve, 100)
+})"""
+
+
+def observer_script() -> str:
+    """Script counting layout changes in the page and reporting them to binding"""
+    return Path(__file__).parent.joinpath("../js/boxCacheObserver.js").read_text()
+
+
+class BoxCache:
+    """Element boxes of a page, valid until the page reports a layout change.
+
+    The observer script calls changed() on DOM mutations, resizes and scrolls in
+    any frame of the page, each call bumps the generation. A box is stored with
+    the generation read before it was measured and is dropped when a change was
+    reported in between.
+    """
+
+    def __init__(self):
+        self.generation = 0
+        self._boxes: Dict[Any, Dict[str, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any) -> Optional[Dict[str, float]]:
+        box = self._boxes.get(key)
+        if box is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return box
+
+    def put(self, key: Any, box: Dict[str, float], generation: Optional[int]) -> None:
+        if generation is None or generation != self.generation:
+            return
+        self._boxes[key] = box
+
+    def changed(self) -> None:
+        """Called by the page on a layout change"""
+        self.generation += 1
+        self._boxes.clear()
+
+    def clear(self) -> None:
+        self._boxes.clear()
@@ -0,0 +1,181 @@
+import math
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+from python_ghost_cursor.shared._math import Vector, RandomSource, spawnSeed
+from python_ghost_cursor.shared._spoof import (
+    path_points,
+    clampPositive,
+    fitts,
+    defaultWidth,
+)
+
+BucketKey = Tuple[int, int, Optional[float]]
+
+
+class _Bucket:
+    def __init__(self, distance: float, width: float, spread: Optional[float]):
+        # Templates of a bucket are generated at the distance and width of the
+        # request that created it
+        self.distance = distance
+        self.width = width
+        self.spread = spread
+        self.templates: List[np.ndarray] = []
+
+
+class PathTemplateCache:
+    """Pool of pre-generated paths that are retargeted to new start and end points.
+
+    Templates are paths from (0, 0) to (1, 0), bucketed by the deterministic part
+    of their Fitts step count and by distance octave (the curve spread depends on
+    the absolute distance). A request picks a random template from its bucket,
+    randomly mirrors it and rotates, scales and translates it onto the real start
+    and end. Buckets below per_bucket templates get a freshly generated path
+    instead, which is added to the bucket; start_refill() tops buckets up from a
+    background thread. The least recently used buckets are evicted once the cache
+    holds more than max_templates templates.
+    """
+
+    def __init__(
+        self,
+        max_templates: int = 4096,
+        per_bucket: int = 16,
+        rng: Optional[Union[int, np.random.Generator]] = None,
+    ):
+        self.max_templates = max_templates
+        self.per_bucket = per_bucket
+        self.rng = np.random.default_rng(rng)
+        # The refill thread has its own generator, generators are not thread-safe
+        self._refill_rng = np.random.default_rng(spawnSeed(self.rng))
+        self._buckets: "OrderedDict[BucketKey, _Bucket]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._refill_thread: Optional[threading.Thread] = None
+        self._refill_stop = threading.Event()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def bucket_key(
+        distance: float, width: float, spread_override: Optional[float] = None
+    ) -> BucketKey:
+        steps = math.ceil(math.log2(fitts(distance * 0.8, width) + 1) * 3)
+        return steps, int(math.log2(distance)), spread_override
+
+    @staticmethod
+    def _template(
+        distance: float, width: float, spread: Optional[float], rng: RandomSource
+    ) -> np.ndarray:
+        # Unclamped, clamping is done after retargeting
+        points = path_points(
+            Vector(0, 0), {"x": distance, "y": 0, "width": width}, spread, rng, False
+        )
+        return points / distance
+
+    def path_points(
+        self,
+        start: Vector,
+        end: Union[Dict, Vector],
+        spread_override: Optional[float] = None,
+    ) -> np.ndarray:
+        """Get a path like shared._spoof.path_points, from the cache when possible"""
+        if isinstance(end, dict):
+            width = end["width"]
+            end = Vector(end["x"], end["y"])
+        else:
+            width = defaultWidth
+        distance = math.hypot(end.x - start.x, end.y - start.y)
+        if distance < 1:
+            return path_points(start, end, spread_override, self.rng)
+        key = self.bucket_key(distance, width, spread_override)
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(distance, width, spread_override)
+            self._buckets.move_to_end(key)
+            if len(bucket.templates) >= self.per_bucket:
+                self.hits += 1
+                template = bucket.templates[self.rng.integers(len(bucket.templates))]
+                mirror = self.rng.random() < 0.5
+            else:
+                self.misses += 1
+                template = None
+
+        if template is None:
+            template = self._template(distance, width, spread_override, self.rng)
+            mirror = False
+            self._add(key, template)
+        return self.retarget(template, start, end, mirror)
+
+    @staticmethod
+    def retarget(
+        template: np.ndarray, start: Vector, end: Vector, mirror: bool = False
+    ) -> np.ndarray:
+        """Map a template from (0, 0) -> (1, 0) onto start -> end"""
+        dx, dy = end.x - start.x, end.y - start.y
+        sign = -1 if mirror else 1
+        # Rotation and scale in one matrix, mirroring flips the template's y axis
+        transform = np.array([[dx, dy], [-dy * sign, dx * sign]])
+        points = template @ transform
+        points += (start.x, start.y)
+        return clampPositive(points)
+
+    def _add(self, key: BucketKey, template: np.ndarray) -> None:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or len(bucket.templates) >= self.per_bucket:
+                return
+            bucket.templates.append(template)
+            self._size += 1
+            while self._size > self.max_templates and len(self._buckets) > 1:
+                _, evicted = self._buckets.popitem(last=False)
+                self._size -= len(evicted.templates)
+
+    def refill(self, rng: Optional[np.random.Generator] = None) -> int:
+        """Top up every bucket to per_bucket templates, returns how many were made"""
+        rng = self.rng if rng is None else rng
+        with self._lock:
+            todo = [
+                (key, bucket, self.per_bucket - len(bucket.templates))
+                for key, bucket in self._buckets.items()
+                if len(bucket.templates) < self.per_bucket
+            ]
+        made = 0
+        for key, bucket, missing in todo:
+            for _ in range(missing):
+                if self._refill_stop.is_set():
+                    return made
+                template = self._template(
+                    bucket.distance, bucket.width, bucket.spread, rng
+                )
+                self._add(key, template)
+                made += 1
+        return made
+
+    def start_refill(self, interval: float = 0.05) -> None:
+        """Keep buckets topped up from a background thread"""
+        if self._refill_thread is not None:
+            return
+        self._refill_stop.clear()
+
+        def run():
+            while not self._refill_stop.is_set():
+                if not self.refill(self._refill_rng):
+                    self._refill_stop.wait(interval)
+
+        self._refill_thread = threading.Thread(
+            target=run, name="ghost-cursor-path-refill", daemon=True
+        )
+        self._refill_thread.start()
+
+    def stop_refill(self) -> None:
+        if self._refill_thread is None:
+            return
+        self._refill_stop.set()
+        self._refill_thread.join()
+        self._refill_thread = None
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,1091 @@
+"""Backend independent cursor logic.
+
+CursorCore holds the state of a cursor and describes its actions as plans:
+generators that yield commands (find an element, get its box, dispatch a path,
+press the mouse, ...) and receive their results. A plan never touches a page, the
+GhostCursor of every backend subclasses CursorCore and only executes commands,
+so movement, caching and instrumentation live here once.
+
+A command names the driver method that executes it in ``handler``. Errors raised
+by a handler are thrown into the plan at the yield that issued the command.
+
+Paths are sent by _dispatch_async for every backend, which only provide the
+calls that send one mouse event.
+"""
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+import numpy as np
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from python_ghost_cursor.shared._math import (
+    Vector,
+    origin,
+    overshoot,
+    RandomSource,
+    getRng,
+)
+from python_ghost_cursor.shared._spoof import (
+    iter_path,
+    path_points,
+    should_overshoot,
+    get_random_box_point,
+)
+from python_ghost_cursor.shared._path import Path
+from python_ghost_cursor.shared._adaptive import AdaptiveDensity
+from python_ghost_cursor.shared._motion import MotionModel, BezierModel, motion_model
+from python_ghost_cursor.shared._scroll import wheel_ticks, settleTimeout
+from python_ghost_cursor.shared._dispatch import chunks_with_last, collect_errors
+from python_ghost_cursor.shared._timing import movement_timestamps, playback
+from python_ghost_cursor.shared._route import in_viewport, plan_route, route_segment
+from python_ghost_cursor.shared._keyboard import (
+    keystroke_schedule,
+    typed_text,
+    defaultWpm,
+    defaultMistakes,
+)
+from python_ghost_cursor.shared._cache import PathTemplateCache
+from python_ghost_cursor.shared._box_cache import BoxCache
+from python_ghost_cursor.shared._frames import FrameOffsets
+from python_ghost_cursor.shared._recording import (
+    TrajectoryRecorder,
+    read_trajectories,
+    segments,
+    segment_points,
+    MOVE,
+    DOWN,
+    UP,
+)
+from python_ghost_cursor.shared._metrics import CursorMetrics, phase
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Command:
+    __slots__ = ()
+    handler = ""
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            "{}={!r}".format(name, getattr(self, name)) for name in self.__slots__
+        )
+        return "{}({})".format(type(self).__name__, fields)
+
+
+class WaitForSelector(Command):
+    """Wait until selector is in the page, for at most timeout milliseconds"""
+
+    __slots__ = ("selector", "timeout")
+    handler = "_on_wait_for_selector"
+
+    def __init__(self, selector: str, timeout: float):
+        self.selector = selector
+        self.timeout = timeout
+
+
+class Find(Command):
+    """Get the element matching selector, or None"""
+
+    __slots__ = ("selector",)
+    handler = "_on_find"
+
+    def __init__(self, selector: str):
+        self.selector = selector
+
+
+class Scroll(Command):
+    """Scroll element into view"""
+
+    __slots__ = ("element",)
+    handler = "_on_scroll"
+
+    def __init__(self, element: Any):
+        self.element = element
+
+
+class ScrollDelta(Command):
+    """Get the [x, y] scroll that centers element in the viewport, [0, 0] if it is visible"""
+
+    __slots__ = ("element",)
+    handler = "_on_scroll_delta"
+
+    def __init__(self, element: Any):
+        self.element = element
+
+
+class Wheel(Command):
+    """Send wheel ticks at position, tick i at timestamps[i] seconds, returns (ticks sent, errors).
+
+    The ticks are pipelined, their replies are only awaited at the end.
+    """
+
+    __slots__ = ("position", "deltas", "timestamps")
+    handler = "_on_wheel"
+
+    def __init__(self, position: Vector, deltas: np.ndarray, timestamps: np.ndarray):
+        self.position = position
+        self.deltas = deltas
+        self.timestamps = timestamps
+
+
+class WaitForScroll(Command):
+    """Wait until the page stops scrolling, for at most timeout milliseconds"""
+
+    __slots__ = ("timeout",)
+    handler = "_on_wait_for_scroll"
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+
+
+class TypeKeys(Command):
+    """Send key events, event i at timestamps[i] seconds, returns (events sent, errors).
+
+    The events are pipelined, their replies are only awaited at the end.
+    """
+
+    __slots__ = ("timestamps", "events")
+    handler = "_on_type_keys"
+
+    def __init__(self, timestamps: np.ndarray, events: List[Dict]):
+        self.timestamps = timestamps
+        self.events = events
+
+
+class FrameOwner(Command):
+    """Get (reference, offset): where the content of frame starts in the viewport
+    of the reference frame, its parent frame or None for the main frame's
+    viewport. (None, None) when frame is the main frame"""
+
+    __slots__ = ("frame",)
+    handler = "_on_frame_owner"
+
+    def __init__(self, frame: Any):
+        self.frame = frame
+
+
+class ScrollPosition(Command):
+    """Get the scroll position of the main frame's document as a Vector"""
+
+    __slots__ = ()
+    handler = "_on_scroll_position"
+
+
+class Settle(Command):
+    """Wait for the page to report pending layout changes"""
+
+    __slots__ = ()
+    handler = "_on_settle"
+
+
+class PollEvents(Command):
+    """Let the driver deliver page events (layout changes) that already arrived"""
+
+    __slots__ = ()
+    handler = "_on_poll_events"
+
+
+class ResolveBoxes(Command):
+    """Get the boxes of the elements matching selectors (None for missing ones) and
+    the viewport size in one call: {"boxes": [...], "viewport": {"width", "height"}}"""
+
+    __slots__ = ("selectors",)
+    handler = "_on_resolve_boxes"
+
+    def __init__(self, selectors: List[str]):
+        self.selectors = selectors
+
+
+class GetBox(Command):
+    """Get the box of element, or None"""
+
+    __slots__ = ("element",)
+    handler = "_on_get_box"
+
+    def __init__(self, element: Any):
+        self.element = element
+
+
+class ComputePath(Command):
+    """Get the points of a path from start to end, density scales their number"""
+
+    __slots__ = ("start", "end", "spread_override", "density")
+    handler = "_on_compute_path"
+
+    def __init__(
+        self,
+        start: Vector,
+        end: Union[Dict, Vector],
+        spread_override: Optional[float] = None,
+        density: float = 1.0,
+    ):
+        self.start = start
+        self.end = end
+        self.spread_override = spread_override
+        self.density = density
+
+
+class Dispatch(Command):
+    """Move the mouse over vectors, returns (points sent, errors).
+
+    pressed moves hold the left button down and are always pipelined. With
+    timestamps, point i is sent timestamps[i] seconds after the first one.
+    """
+
+    __slots__ = ("vectors", "abort_on_move", "pressed", "timestamps")
+    handler = "_on_dispatch"
+
+    def __init__(
+        self,
+        vectors: Iterable[Vector],
+        abort_on_move: bool = False,
+        pressed: bool = False,
+        timestamps: Optional[np.ndarray] = None,
+    ):
+        self.vectors = vectors
+        self.abort_on_move = abort_on_move
+        self.pressed = pressed
+        self.timestamps = timestamps
+
+
+class MouseDown(Command):
+    __slots__ = ()
+    handler = "_on_mouse_down"
+
+
+class MouseUp(Command):
+    __slots__ = ()
+    handler = "_on_mouse_up"
+
+
+class Sleep(Command):
+    __slots__ = ("seconds",)
+    handler = "_on_sleep"
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+
+class WindowBounds(Command):
+    """Get the {"width", "height"} of the browser window"""
+
+    __slots__ = ()
+    handler = "_on_window_bounds"
+
+
+Plan = Generator[Command, Any, T]
+
+
+def drive(plan: Plan, execute: Callable[[Command], Any]) -> Any:
+    """Run a plan, executing its commands with execute.
+
+    Interrupts and cancellations are thrown into the plan like errors, so it
+    can clean up (e.g. release the mouse button) before they propagate.
+    """
+    result = error = None
+    while True:
+        try:
+            command = plan.send(result) if error is None else plan.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            result, error = execute(command), None
+        except BaseException as exc:
+            result, error = None, exc
+
+
+async def drive_async(plan: Plan, execute: Callable[[Command], Awaitable]) -> Any:
+    """Run a plan, awaiting the execution of its commands"""
+    result = error = None
+    while True:
+        try:
+            command = plan.send(result) if error is None else plan.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            result, error = await execute(command), None
+        except BaseException as exc:
+            result, error = None, exc
+
+
+class CursorCore(ABC):
+    # Shown when a selector matches nothing
+    wait_for_selector_hint = "page.wait_for_selector"
+
+    def __init__(self, start: Vector, rng: RandomSource = None):
+        # Each cursor owns its generator, pass a seed for reproducible movements
+        self.rng = getRng(rng) if rng is not None else np.random.default_rng()
+        self.previous = start
+        self.moving = False
+        self.overshoot_spread = 10
+        self.overshoot_radius = 120
+        # "mouse" waits for page.mouse.move for every point, "cdp" pipelines the
+        # Input.dispatchMouseEvent calls of a path and waits for them once
+        self.dispatch_mode = "mouse"
+        # Send every point at its timestamp on a human velocity profile instead
+        # of as fast as the browser answers
+        self.realtime = False
+        # "jump" scrolls elements into view at once, "wheel" scrolls like scroll_to
+        self.scroll_mode = "jump"
+        # Shape of the paths, a name from shared._motion.motionModels or a
+        # MotionModel. Only the default "bezier" uses the path template cache
+        self.motion_model: Union[str, MotionModel, None] = None
+        # Serve paths from retargeted templates instead of generating each one
+        self.path_cache: Optional[PathTemplateCache] = None
+        # Assign an AdaptiveDensity to scale paths to the browser's latency
+        self.adaptive_density: Optional[AdaptiveDensity] = None
+        # Set by enable_box_cache
+        self.box_cache: Optional[BoxCache] = None
+        # Assign a CursorMetrics to collect counters and phase timings
+        self.metrics: Optional[CursorMetrics] = None
+        # Size of the browser window, measured once for random moves. Set it
+        # back to None after resizing the window to measure it again
+        self.window_bounds: Optional[Dict[str, float]] = None
+        # Offsets of the page's frames, for points given relative to a frame
+        self.frame_offsets = FrameOffsets()
+        self._watching_frames = False
+        # Assign a TrajectoryRecorder to log the dispatched paths and clicks
+        self.recorder: Optional[TrajectoryRecorder] = None
+
+    def toggle_random_move(self, random_: bool) -> None:
+        self.moving = not random_
+
+    def _execute(self, command: Command) -> Any:
+        return getattr(self, command.handler)(command)
+
+    def _model(self) -> Optional[MotionModel]:
+        """The cursor's motion model, None for the default Bezier curves"""
+        model = motion_model(self.motion_model)
+        # Subclasses may override points(), only the built-in model is the default
+        return None if type(model) is BezierModel else model
+
+    def _path_inline(
+        self,
+        start: Vector,
+        end: Union[Dict, Vector],
+        spread_override: Optional[float] = None,
+        density: float = 1.0,
+    ) -> Iterable[Vector]:
+        """Compute a path, from the template cache if the cursor has one.
+
+        Otherwise the path is computed lazily, chunk by chunk, while it is sent,
+        unless it is resampled to an adaptive density. Templates have a fixed
+        number of points and a Bezier shape, so other densities and motion
+        models bypass the cache.
+        """
+        model = self._model()
+        if self.path_cache is None or density != 1 or model is not None:
+            if self.adaptive_density is not None:
+                return Path(
+                    path_points(
+                        start, end, spread_override, self.rng, True, density, model
+                    )
+                )
+            return iter_path(
+                start, end, spread_override, self.rng, density=density, model=model
+            )
+        return Path(self.path_cache.path_points(start, end, spread_override))
+
+    def _resample(self, vectors: Iterable[Vector]) -> Iterable[Vector]:
+        """Resample a path to the adaptive density, if the cursor has one"""
+        if self.adaptive_density is None:
+            return vectors
+        return self.adaptive_density.resample(vectors)
+
+    def _box_key(self, selector: Any) -> Any:
+        """Key of an element in the box cache, None to not cache it"""
+        return selector
+
+    def _record(self, kind: int) -> None:
+        if self.recorder is not None:
+            self.recorder.event(kind, self.previous)
+
+    def _sent(self, v: Vector, due: Optional[float] = None) -> None:
+        """Called by the backends for every point of a path they send.
+
+        due is the time of the point in the path's schedule, when it has one.
+        """
+        self.previous = v
+        if self.recorder is not None:
+            self.recorder.sent(v, due)
+
+    @abstractmethod
+    def _is_connected(self) -> bool:
+        """Whether the browser is still connected"""
+
+    @abstractmethod
+    def _mouse_move(self, v: Vector) -> Awaitable:
+        """Move the driver's mouse to v, so the driver knows where the mouse is"""
+
+    @abstractmethod
+    def _cdp_move(self, v: Vector, pressed: bool) -> Awaitable:
+        """Send a CDP mouseMoved event to v, with the left button held when pressed"""
+
+    async def _send(self, awaitable: Awaitable) -> Any:
+        """Await a browser call"""
+        return await awaitable
+
+    async def _start(self, awaitable: Awaitable) -> "asyncio.Future":
+        """Start a pipelined browser call in a task"""
+        return asyncio.ensure_future(awaitable)
+
+    async def _dispatch_async(
+        self, command: Dispatch
+    ) -> Tuple[int, List[BaseException]]:
+        """Send the points of a Dispatch, on the event loop of the driver"""
+        pipelined = self.dispatch_mode == "cdp" or command.pressed
+        if self.realtime or command.timestamps is not None:
+            return await self._play_path(
+                command.vectors,
+                command.abort_on_move,
+                pipelined,
+                command.pressed,
+                command.timestamps,
+            )
+        if pipelined:
+            return await self._pipeline_path(
+                command.vectors, command.abort_on_move, command.pressed
+            )
+        return await self._move_path(command.vectors, command.abort_on_move)
+
+    async def _move_path(
+        self, vectors: Iterable[Vector], abort_on_move: bool = False
+    ) -> Tuple[int, List[BaseException]]:
+        """Await a move of the driver's mouse for every point"""
+        sent = 0
+        errors = []
+        for v in vectors:
+            # In case this is called from random mouse movements and the users wants to move the mouse, abort
+            if abort_on_move and self.moving:
+                break
+            sent += 1
+            try:
+                await self._send(self._mouse_move(v))
+                self._sent(v)
+            except Exception as exc:
+                errors.append(exc)
+                # Stop if the browser is no longer connected
+                if not self._is_connected():
+                    break
+        return sent, errors
+
+    async def _pipeline_path(
+        self,
+        vectors: Iterable[Vector],
+        abort_on_move: bool = False,
+        pressed: bool = False,
+    ) -> Tuple[int, List[BaseException]]:
+        """Send the moves of a path without waiting for each reply, errors are collected at the end"""
+        pending = []
+        for chunk, last in chunks_with_last(vectors):
+            # In case this is called from random mouse movements and the users wants to move the mouse, abort
+            if abort_on_move and self.moving:
+                break
+            if not self._is_connected():
+                break
+            for v in chunk:
+                pending.append(await self._start(self._cdp_move(v, pressed)))
+                self._sent(v)
+            # The last point goes through the driver's mouse so it knows where the mouse is
+            if last is not None:
+                pending.append(await self._start(self._mouse_move(last)))
+                self._sent(last)
+            # Give other tasks (e.g. a user move aborting random moves) a chance to run
+            await asyncio.sleep(0)
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        return len(pending), collect_errors(results)
+
+    async def _play_path(
+        self,
+        vectors: Iterable[Vector],
+        abort_on_move: bool = False,
+        pipelined: bool = False,
+        pressed: bool = False,
+        timestamps: Optional[np.ndarray] = None,
+    ) -> Tuple[int, List[BaseException]]:
+        """Send the points of a path when they are due, dropping overdue points instead of drifting.
+
+        Points are timed like a human move unless timestamps are given.
+        """
+        # Timestamps depend on the whole path, so it can't be streamed
+        vectors = list(vectors)
+        schedule = movement_timestamps(vectors) if timestamps is None else timestamps
+        pending = []
+        errors = []
+        sent = 0
+        last = len(vectors) - 1
+        for delay, i in playback(schedule):
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # In case this is called from random mouse movements and the users wants to move the mouse, abort
+            if abort_on_move and self.moving:
+                break
+            v = vectors[i]
+            sent += 1
+            # The last point goes through the driver's mouse so it knows where the mouse is
+            if pipelined and i != last:
+                pending.append(await self._start(self._cdp_move(v, pressed)))
+            else:
+                try:
+                    await self._send(self._mouse_move(v))
+                except Exception as exc:
+                    errors.append(exc)
+                    # Stop if the browser is no longer connected
+                    if not self._is_connected():
+                        break
+                    continue
+            self._sent(v, float(schedule[i]))
+        errors += collect_errors(await asyncio.gather(*pending, return_exceptions=True))
+        return sent, errors
+
+    def _trace_plan(
+        self,
+        vectors: Iterable[Vector],
+        abort_on_move: bool = False,
+        pressed: bool = False,
+        timestamps: Optional[np.ndarray] = None,
+    ) -> Plan[Tuple[int, List[BaseException]]]:
+        """Dispatch vectors, returns (points sent, errors)"""
+        recorder = self.recorder
+        started = time.perf_counter()
+        try:
+            with phase(self.metrics, "dispatch"):
+                sent, errors = yield Dispatch(
+                    vectors, abort_on_move, pressed, timestamps
+                )
+        finally:
+            if recorder is not None:
+                recorder.end_path()
+        adaptive = self.adaptive_density
+        # Paced dispatches take as long as their schedule, not as the browser
+        if adaptive is not None and not self.realtime and timestamps is None:
+            adaptive.observe(time.perf_counter() - started, sent)
+            if self.metrics is not None:
+                self.metrics.set("path_density", adaptive.density)
+                self.metrics.set(
+                    "dispatch_seconds_per_point", adaptive.seconds_per_point
+                )
+        if self.metrics is not None:
+            self.metrics.inc("points_dispatched", sent)
+            if errors:
+                self.metrics.inc("dispatch_errors", len(errors))
+        if errors and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Warning: could not move mouse %d times, error message: %s",
+                len(errors),
+                errors[0],
+            )
+        return sent, errors
+
+    def _path_plan(
+        self,
+        start: Vector,
+        end: Union[Dict, Vector],
+        spread_override: Optional[float] = None,
+        abort_on_move: bool = False,
+        density: float = 1.0,
+        pressed: bool = False,
+    ) -> Plan[Tuple[int, List[BaseException]]]:
+        with phase(self.metrics, "path"):
+            vectors = yield ComputePath(start, end, spread_override, density)
+            vectors = self._resample(vectors)
+        return (yield from self._trace_plan(vectors, abort_on_move, pressed))
+
+    def _find_plan(
+        self, selector: Any, wait_for_selector: Optional[float] = None
+    ) -> Plan[Any]:
+        """Get the element matching a selector, or the element handle itself"""
+        if not isinstance(selector, str):  # ElementHandle
+            return selector
+        if wait_for_selector:
+            with phase(self.metrics, "wait_for_selector"):
+                yield WaitForSelector(selector, wait_for_selector)
+        with phase(self.metrics, "query"):
+            elem = yield Find(selector)
+        if elem is None:
+            raise self._not_found(selector)
+        return elem
+
+    def _not_found(self, selector: str) -> Exception:
+        return Exception(
+            'Could not find element with selector "${}", make sure you\'re waiting for the elements with "{}"'.format(
+                selector, self.wait_for_selector_hint
+            )
+        )
+
+    def _wheel_plan(self, elem: Any) -> Plan[None]:
+        """Scroll elem into view with wheel ticks at the mouse position.
+
+        Visibility is only checked again once all ticks are sent and the smooth
+        scroll they started has come to rest. If the wheel did not bring elem into
+        view (e.g. the mouse is over another scroll container), it is scrolled into
+        view at once.
+        """
+        delta_x, delta_y = yield ScrollDelta(elem)
+        if delta_x == 0 and delta_y == 0:
+            return
+        deltas, timestamps = wheel_ticks(delta_x, delta_y, self.rng)
+        sent, errors = yield Wheel(self.previous, deltas, timestamps)
+        if self.metrics is not None:
+            self.metrics.inc("scrolls")
+            if errors:
+                self.metrics.inc("dispatch_errors", len(errors))
+        if errors and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Warning: could not scroll %d times, error message: %s",
+                len(errors),
+                errors[0],
+            )
+        yield WaitForScroll(settleTimeout)
+        delta_x, delta_y = yield ScrollDelta(elem)
+        if delta_x != 0 or delta_y != 0:
+            yield Scroll(elem)
+
+    def _scroll_to_plan(
+        self, selector: Any, wait_for_selector: Optional[float] = None
+    ) -> Plan[None]:
+        self.toggle_random_move(False)
+        elem = yield from self._find_plan(selector, wait_for_selector)
+        with phase(self.metrics, "scroll"):
+            yield from self._wheel_plan(elem)
+        self.toggle_random_move(True)
+
+    def _element_box_plan(
+        self, selector: Any, wait_for_selector: Optional[float] = None
+    ) -> Plan[Dict[str, float]]:
+        """Find an element, scroll it into view and get its box, unless the box is cached"""
+        key = self._box_key(selector)
+        if self.box_cache is not None and key is not None:
+            yield PollEvents()
+            box = self.box_cache.get(key)
+            if box is not None:
+                return box
+        elem = yield from self._find_plan(selector, wait_for_selector)
+
+        # Make sure the object is in view
+        with phase(self.metrics, "scroll"):
+            if self.scroll_mode == "wheel":
+                yield from self._wheel_plan(elem)
+            else:
+                yield Scroll(elem)
+            generation = None
+            if self.box_cache is not None:
+                yield Settle()
+                yield PollEvents()
+                generation = self.box_cache.generation
+        with phase(self.metrics, "bounding_box"):
+            box = yield GetBox(elem)
+        if box is None:
+            raise Exception(
+                "Could not find the dimensions of the element you're clicking on, this might be a bug?"
+            )
+        if self.box_cache is not None and key is not None:
+            self.box_cache.put(key, box, generation)
+        return box
+
+    def _move_plan(
+        self,
+        selector: Any,
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+    ) -> Plan[None]:
+        self.toggle_random_move(False)
+        try:
+            box = yield from self._element_box_plan(selector, wait_for_selector)
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.inc("failed_moves")
+            raise
+        yield from self._move_to_box_plan(box, padding_percentage)
+        self.toggle_random_move(True)
+
+    def _move_to_box_plan(
+        self,
+        box: Dict[str, float],
+        padding_percentage: Optional[float] = None,
+        density: float = 1.0,
+        pressed: bool = False,
+    ) -> Plan[None]:
+        """Move to a random point of box, overshooting it on long moves"""
+        destination = get_random_box_point(box, padding_percentage, self.rng)
+        dimensions = {"height": box["height"], "width": box["width"]}
+        overshooting = should_overshoot(self.previous, destination)
+        to = (
+            overshoot(destination, self.overshoot_radius, self.rng)
+            if overshooting
+            else destination
+        )
+        yield from self._path_plan(
+            self.previous, to, density=density, pressed=pressed
+        )
+
+        if overshooting:
+            bounding_box = {
+                "height": dimensions["height"],
+                "width": dimensions["width"],
+                "x": destination.x,
+                "y": destination.y,
+            }
+            yield from self._path_plan(
+                to,
+                bounding_box,
+                self.overshoot_spread,
+                density=density,
+                pressed=pressed,
+            )
+        if self.metrics is not None:
+            self.metrics.inc("moves")
+            if overshooting:
+                self.metrics.inc("overshoots")
+        self.previous = destination
+
+    def _frame_offset_plan(self, frame: Any) -> Plan[Vector]:
+        """Get where the content of frame starts in the main frame's viewport.
+
+        Offsets are cached per frame, relative to the main frame's document, and
+        built from the cached offset of the parent frame. A frame costs a lookup
+        per level the first time, after that only the page's scroll position is
+        read.
+        """
+        generation = None
+        if self.box_cache is not None:
+            yield PollEvents()
+            generation = self.box_cache.generation
+        scroll = yield ScrollPosition()
+        offset = yield from self._document_offset_plan(frame, scroll, generation)
+        return Vector(offset.x - scroll.x, offset.y - scroll.y)
+
+    def _document_offset_plan(
+        self, frame: Any, scroll: Vector, generation: Optional[int]
+    ) -> Plan[Vector]:
+        """Get where the content of frame starts in the main frame's document"""
+        offset = self.frame_offsets.get(frame, generation)
+        if offset is not None:
+            return offset
+        reference, local = yield FrameOwner(frame)
+        if local is None:
+            # The main frame's viewport starts where its document is scrolled to
+            return scroll
+        base = scroll
+        if reference is not None:
+            base = yield from self._document_offset_plan(reference, scroll, generation)
+        offset = Vector(base.x + local.x, base.y + local.y)
+        self.frame_offsets.put(frame, reference, offset)
+        return offset
+
+    def _move_to_plan(self, destination: Dict, frame: Any = None) -> Plan[None]:
+        destination_vector = Vector(destination["x"], destination["y"])
+        if frame is not None:
+            offset = yield from self._frame_offset_plan(frame)
+            destination_vector = Vector(
+                destination_vector.x + offset.x, destination_vector.y + offset.y
+            )
+        self.toggle_random_move(False)
+        yield from self._path_plan(self.previous, destination_vector)
+        if self.metrics is not None:
+            self.metrics.inc("moves")
+        self.toggle_random_move(True)
+
+    def _click_plan(
+        self,
+        selector: Any,
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+        wait_for_click: Optional[float] = None,
+    ) -> Plan[None]:
+        self.toggle_random_move(False)
+        if selector is not None:
+            yield from self._move_plan(selector, padding_percentage, wait_for_selector)
+            self.toggle_random_move(False)
+
+        yield from self._press_plan(wait_for_click)
+        self.toggle_random_move(True)
+
+    def _press_plan(self, wait_for_click: Optional[float] = None) -> Plan[None]:
+        """Click where the mouse is, then pause"""
+        try:
+            with phase(self.metrics, "click"):
+                yield MouseDown()
+                self._record(DOWN)
+                if wait_for_click is not None:
+                    try:
+                        yield Sleep(wait_for_click / 1000)
+                    except BaseException:
+                        # Cancelled while pressed, release the button first
+                        yield MouseUp()
+                        self._record(UP)
+                        raise
+                yield MouseUp()
+                self._record(UP)
+            if self.metrics is not None:
+                self.metrics.inc("clicks")
+        except Exception as exc:
+            logger.debug("Warning: could not click mouse, error message: %s", exc)
+
+        with phase(self.metrics, "post_click_sleep"):
+            yield Sleep(self.rng.random() * 2)
+
+    def _resolve_boxes_plan(
+        self, selectors: List[str], wait_for_selector: Optional[float] = None
+    ) -> Plan[Tuple[List[Dict[str, float]], Dict[str, float]]]:
+        """Get the boxes of selectors and the viewport size with one call"""
+        if wait_for_selector:
+            with phase(self.metrics, "wait_for_selector"):
+                for selector in selectors:
+                    yield WaitForSelector(selector, wait_for_selector)
+        with phase(self.metrics, "bounding_box"):
+            result = yield ResolveBoxes(selectors)
+        for selector, box in zip(selectors, result["boxes"]):
+            if box is None:
+                raise self._not_found(selector)
+        return result["boxes"], result["viewport"]
+
+    def _route_plan(
+        self,
+        selectors: Sequence[str],
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+    ) -> Plan[List[Tuple[Vector, bool, Path]]]:
+        boxes, _ = yield from self._resolve_boxes_plan(
+            list(selectors), wait_for_selector
+        )
+        with phase(self.metrics, "path"):
+            return plan_route(
+                self.previous,
+                boxes,
+                padding_percentage,
+                self.rng,
+                self.overshoot_radius,
+                self.overshoot_spread,
+                self._model(),
+            )
+
+    def _click_sequence_plan(
+        self,
+        selectors: Sequence[str],
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+        wait_for_click: Optional[float] = None,
+    ) -> Plan[None]:
+        """Click selectors in order along a route planned from one batch of boxes.
+
+        A target outside the viewport is scrolled into view when its turn comes,
+        then the boxes of the remaining targets are fetched again in one call and
+        only the segments whose ends moved are planned again.
+        """
+        self.toggle_random_move(False)
+        selectors = list(selectors)
+        boxes, viewport = yield from self._resolve_boxes_plan(
+            selectors, wait_for_selector
+        )
+        with phase(self.metrics, "path"):
+            route = plan_route(
+                self.previous,
+                boxes,
+                padding_percentage,
+                self.rng,
+                self.overshoot_radius,
+                self.overshoot_spread,
+                self._model(),
+            )
+        for i, selector in enumerate(selectors):
+            if not in_viewport(boxes[i], viewport):
+                elem = yield from self._find_plan(selector)
+                with phase(self.metrics, "scroll"):
+                    if self.scroll_mode == "wheel":
+                        yield from self._wheel_plan(elem)
+                    else:
+                        yield Scroll(elem)
+                fresh, viewport = yield from self._resolve_boxes_plan(selectors[i:])
+                start = self.previous
+                moved = False
+                for j, box in enumerate(fresh, i):
+                    moved = moved or box != boxes[j]
+                    if moved:
+                        boxes[j] = box
+                        route[j] = route_segment(
+                            start,
+                            box,
+                            padding_percentage,
+                            self.rng,
+                            self.overshoot_radius,
+                            self.overshoot_spread,
+                            self._model(),
+                        )
+                    start = route[j][0]
+
+            destination, overshooting, points = route[i]
+            yield from self._trace_plan(self._resample(points))
+            if self.metrics is not None:
+                self.metrics.inc("moves")
+                if overshooting:
+                    self.metrics.inc("overshoots")
+            self.previous = destination
+            yield from self._press_plan(wait_for_click)
+        self.toggle_random_move(True)
+
+    def _type_plan(
+        self,
+        selector: Any,
+        text: str,
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+        wpm: float = defaultWpm,
+        mistakes: float = defaultMistakes,
+    ) -> Plan[None]:
+        """Click selector (unless it is None) and type text on a precomputed keystroke schedule"""
+        if selector is not None:
+            yield from self._click_plan(selector, padding_percentage, wait_for_selector)
+        self.toggle_random_move(False)
+        timestamps, events = keystroke_schedule(text, self.rng, wpm, mistakes)
+        with phase(self.metrics, "type"):
+            sent, errors = yield TypeKeys(timestamps, events)
+        if self.metrics is not None:
+            # Characters typed, not key events: Shift and erased typos don't count
+            self.metrics.inc("keystrokes", len(typed_text(events[:sent])))
+            if errors:
+                self.metrics.inc("dispatch_errors", len(errors))
+        if errors and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Warning: could not send %d key events, error message: %s",
+                len(errors),
+                errors[0],
+            )
+        self.toggle_random_move(True)
+
+    def _drag_plan(
+        self,
+        source: Any,
+        target: Any,
+        padding_percentage: Optional[float] = None,
+        wait_for_selector: Optional[float] = None,
+        hold: Optional[float] = None,
+        density: float = 1.0,
+    ) -> Plan[None]:
+        """Press the mouse on source, move it to target with the button held and release it.
+
+        target is a selector or element like source, or a point ({"x", "y"} or a
+        Vector) to drop at exactly. hold is the pause in milliseconds after the
+        press and before the release, random between 50 and 150 ms by default.
+        """
+        self.toggle_random_move(False)
+        yield from self._move_plan(source, padding_percentage, wait_for_selector)
+        self.toggle_random_move(False)
+        if isinstance(target, Vector):
+            box = None
+        elif isinstance(target, dict) and "width" not in target:
+            target = Vector(target["x"], target["y"])
+            box = None
+        elif isinstance(target, dict):
+            box = target
+        else:
+            box = yield from self._element_box_plan(target, wait_for_selector)
+
+        with phase(self.metrics, "drag"):
+            yield MouseDown()
+            self._record(DOWN)
+            try:
+                yield Sleep(self._hold_seconds(hold))
+                if box is None:
+                    yield from self._path_plan(
+                        self.previous, target, density=density, pressed=True
+                    )
+                    self.previous = target
+                    if self.metrics is not None:
+                        self.metrics.inc("moves")
+                else:
+                    yield from self._move_to_box_plan(
+                        box, padding_percentage, density, pressed=True
+                    )
+                yield Sleep(self._hold_seconds(hold))
+            except BaseException:
+                # Never leave the button pressed when the move failed or the
+                # drag was cancelled
+                yield MouseUp()
+                self._record(UP)
+                raise
+            yield MouseUp()
+            self._record(UP)
+        if self.metrics is not None:
+            self.metrics.inc("drags")
+        self.toggle_random_move(True)
+
+    def _replay_plan(self, records: Any, realtime: bool = True) -> Plan[None]:
+        """Play back the paths, downs and ups of records (an array or a trajectory log file).
+
+        When realtime, points are sent at their recorded times and the recorded
+        pauses are kept, otherwise everything is sent as fast as possible.
+        """
+        if not isinstance(records, np.ndarray):
+            records = read_trajectories(records)
+        self.toggle_random_move(False)
+        end = None
+        for kind, run in segments(records):
+            times = run["time"]
+            if realtime and end is not None and times[0] > end:
+                yield Sleep(float(times[0] - end))
+            if kind == MOVE:
+                points = segment_points(run)
+                timestamps = times - times[0] if realtime else None
+                yield from self._trace_plan(points, timestamps=timestamps)
+                self.previous = points[-1]
+            elif kind == DOWN:
+                yield MouseDown()
+                self._record(DOWN)
+            elif kind == UP:
+                yield MouseUp()
+                self._record(UP)
+            end = times[-1]
+        self.toggle_random_move(True)
+
+    def _hold_seconds(self, hold: Optional[float]) -> float:
+        if hold is None:
+            return 0.05 + self.rng.random() * 0.1
+        return hold / 1000
+
+    def _random_point_plan(self) -> Plan[Vector]:
+        """Get a random point on the browser window"""
+        if self.window_bounds is None:
+            self.window_bounds = yield WindowBounds()
+        return get_random_box_point(
+            {
+                "x": origin.x,
+                "y": origin.y,
+                "width": self.window_bounds["width"],
+                "height": self.window_bounds["height"],
+            },
+            rng=self.rng,
+        )
+
+    def _random_move_plan(self) -> Plan[bool]:
+        """One step of random mouse movements, False once they no longer reach the page.
+
+        The cursor stays at the last point sent, the move may have been cut
+        short by a move of the user's.
+        """
+        if not self.moving:
+            rand = yield from self._random_point_plan()
+            sent, errors = yield from self._path_plan(
+                self.previous, rand, abort_on_move=True
+            )
+            if errors and len(errors) >= sent:
+                return False
+        yield Sleep(self.rng.random() * 2)
+        return True
@@ -0,0 +1,68 @@
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from python_ghost_cursor.shared._math import Vector
+
+# Number of mouse events sent between two abort_on_move checks in "cdp" dispatch mode
+chunkSize = 16
+
+# CDP "buttons" bit of each button, for the buttons held during a move
+buttonMask = {"none": 0, "left": 1, "right": 2, "middle": 4, "back": 8, "forward": 16}
+
+
+def mouse_moved_event(v: Vector, button: str = "none", modifiers: int = 0) -> Dict:
+    """Params of a CDP Input.dispatchMouseEvent mouseMoved event, button is the one held"""
+    return {
+        "type": "mouseMoved",
+        "x": v.x,
+        "y": v.y,
+        "button": button,
+        "buttons": buttonMask.get(button, 0),
+        "modifiers": modifiers,
+    }
+
+
+def mouse_wheel_event(
+    v: Vector, delta_x: float, delta_y: float, modifiers: int = 0
+) -> Dict:
+    """Params of a CDP Input.dispatchMouseEvent mouseWheel event at v"""
+    return {
+        "type": "mouseWheel",
+        "x": v.x,
+        "y": v.y,
+        "deltaX": delta_x,
+        "deltaY": delta_y,
+        "modifiers": modifiers,
+    }
+
+
+def chunks(vectors: Iterable[Vector], size: int = chunkSize) -> Iterator[List[Vector]]:
+    """Split a path into the chunks that are pipelined together, lazily"""
+    iterator = iter(vectors)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def chunks_with_last(
+    vectors: Iterable[Vector], size: int = chunkSize
+) -> Iterator[Tuple[List[Vector], Optional[Vector]]]:
+    """Like chunks, but hold back the very last point of the path.
+
+    Yields (chunk, last) pairs where last is None except for the final chunk,
+    which is yielded without its last point.
+    """
+    iterator = chunks(vectors, size)
+    chunk = next(iterator, None)
+    while chunk is not None:
+        following = next(iterator, None)
+        if following is None:
+            yield chunk[:-1], chunk[-1]
+        else:
+            yield chunk, None
+        chunk = following
+
+
+def collect_errors(results: Sequence) -> List[BaseException]:
+    """Get the errors out of the results of asyncio.gather(..., return_exceptions=True)"""
+    return [result for result in results if isinstance(result, BaseException)]
@@ -0,0 +1,69 @@
+from typing import Any, Dict, Optional
+from python_ghost_cursor.shared._math import Vector
+
+# Position of an iframe's content box (inside its border and padding) in the
+# viewport of the frame that contains it
+content_offset_script = """element => {
+    const rect = element.getBoundingClientRect()
+    const style = getComputedStyle(element)
+    return [
+        rect.left + element.clientLeft + parseFloat(style.paddingLeft),
+        rect.top + element.clientTop + parseFloat(style.paddingTop),
+    ]
+}"""
+
+# Scroll position of the main frame's document
+scroll_position_script = "() => [window.scrollX, window.scrollY]"
+
+
+class FrameOffsets:
+    """Offsets of frames from the main frame's document.
+
+    The offset of a frame is the sum of the content box positions of the iframes
+    between it and the main frame. Each frame's offset is measured once, from the
+    cached offset of its parent, and dropped when the frame or one of its
+    ancestors navigates or is detached. Offsets are kept relative to the main
+    document, so they hold when the page scrolls: the cursor subtracts the
+    current scroll position when it reads them. When the cursor has a box cache,
+    they are also dropped on the layout changes it reports, which covers scrolls
+    inside the frames and moved iframes.
+    """
+
+    def __init__(self):
+        self.generation = 0
+        self._offsets: Dict[Any, Vector] = {}
+        self._parents: Dict[Any, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, frame: Any, generation: Optional[int] = None) -> Optional[Vector]:
+        if generation is not None and generation > self.generation:
+            self.generation = generation
+            self.clear()
+        offset = self._offsets.get(frame)
+        if offset is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return offset
+
+    def put(self, frame: Any, parent: Any, offset: Vector) -> None:
+        self._offsets[frame] = offset
+        self._parents[frame] = parent
+
+    def invalidate(self, frame: Any) -> None:
+        """Drop the offsets of frame and of the frames inside it"""
+        dropped = []
+        for other in self._offsets:
+            ancestor = other
+            while ancestor is not None and ancestor != frame:
+                ancestor = self._parents.get(ancestor)
+            if ancestor is not None:
+                dropped.append(other)
+        for other in dropped:
+            del self._offsets[other]
+            del self._parents[other]
+
+    def clear(self) -> None:
+        self._offsets.clear()
+        self._parents.clear()
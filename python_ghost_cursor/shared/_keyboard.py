@@ -0,0 +1,252 @@
+import math
+import time
+import numpy as np
+from typing import Callable, Dict, Iterator, List, Tuple
+from python_ghost_cursor.shared._math import RandomSource, randomBlock
+
+# Words per minute (of 5 characters) of the default typist
+defaultWpm = 60
+# Chance of hitting a neighbouring key instead of a letter, then correcting it
+defaultMistakes = 0.02
+# Chance of a pause between two words
+thinkingPause = 0.15
+
+# Letter pairs typed faster than others, they are frequent and mostly alternate hands
+_fastDigraphs = frozenset(
+    "th he in er an re on at en nd ti es or te of ed is "
+    "it al ar st to nt ng se ha as ou io le ve".split()
+)
+_rows = ("1234567890-=", "qwertyuiop[]", "asdfghjkl;'", "zxcvbnm,./")
+_shiftedPunctuation = (
+    ("-", "_", "Minus", 189),
+    ("=", "+", "Equal", 187),
+    ("[", "{", "BracketLeft", 219),
+    ("]", "}", "BracketRight", 221),
+    ("\\", "|", "Backslash", 220),
+    (";", ":", "Semicolon", 186),
+    ("'", '"', "Quote", 222),
+    (",", "<", "Comma", 188),
+    (".", ">", "Period", 190),
+    ("/", "?", "Slash", 191),
+    ("`", "~", "Backquote", 192),
+)
+
+
+def _neighbour_keys() -> Dict[str, str]:
+    """Letters next to each letter on a QWERTY keyboard, for typos"""
+    neighbours = {}
+    for r, row in enumerate(_rows):
+        for c, char in enumerate(row):
+            if not char.isalpha():
+                continue
+            near = [row[i] for i in (c - 1, c + 1) if 0 <= i < len(row)]
+            for other in (_rows[r - 1] if r else "", _rows[r + 1] if r < 3 else ""):
+                near += [other[i] for i in (c, c + 1) if i < len(other)]
+            neighbours[char] = "".join(key for key in near if key.isalpha())
+    return neighbours
+
+
+def _us_layout() -> Dict[str, Tuple[str, int, bool]]:
+    """Map characters to their (code, windowsVirtualKeyCode, shift) on a US keyboard"""
+    layout = {" ": ("Space", 32, False)}
+    for char in "abcdefghijklmnopqrstuvwxyz":
+        layout[char] = ("Key" + char.upper(), ord(char.upper()), False)
+        layout[char.upper()] = ("Key" + char.upper(), ord(char.upper()), True)
+    for digit, shifted in zip("1234567890", "!@#$%^&*()"):
+        layout[digit] = ("Digit" + digit, ord(digit), False)
+        layout[shifted] = ("Digit" + digit, ord(digit), True)
+    for plain, shifted, code, vk in _shiftedPunctuation:
+        layout[plain] = (code, vk, False)
+        layout[shifted] = (code, vk, True)
+    return layout
+
+
+_neighbours = _neighbour_keys()
+_layout = _us_layout()
+
+shiftModifier = 8
+# The left Shift key, held around runs of shifted characters
+shiftDown = {
+    "type": "rawKeyDown",
+    "key": "Shift",
+    "code": "ShiftLeft",
+    "windowsVirtualKeyCode": 16,
+    "location": 1,
+    "modifiers": shiftModifier,
+}
+shiftUp = dict(shiftDown, type="keyUp", modifiers=0)
+
+
+def key_events(char: str) -> Tuple[Dict, Dict]:
+    """Params of the CDP Input.dispatchKeyEvent keyDown and keyUp events typing char"""
+    if char == "\b":
+        down = {
+            "type": "rawKeyDown",
+            "key": "Backspace",
+            "code": "Backspace",
+            "windowsVirtualKeyCode": 8,
+        }
+        return down, dict(down, type="keyUp")
+    if char in ("\n", "\r"):
+        down = {
+            "type": "keyDown",
+            "key": "Enter",
+            "code": "Enter",
+            "windowsVirtualKeyCode": 13,
+            "text": "\r",
+            "unmodifiedText": "\r",
+        }
+        up = {
+            "type": "keyUp",
+            "key": "Enter",
+            "code": "Enter",
+            "windowsVirtualKeyCode": 13,
+        }
+        return down, up
+    if char not in _layout:
+        # No key on a US keyboard, the text is inserted without a key code
+        down = {"type": "keyDown", "key": char, "text": char}
+        return down, {"type": "keyUp", "key": char}
+    code, vk, shift = _layout[char]
+    modifiers = shiftModifier if shift else 0
+    down = {
+        "type": "keyDown",
+        "key": char,
+        "code": code,
+        "windowsVirtualKeyCode": vk,
+        "text": char,
+        "unmodifiedText": char.lower() if shift else char,
+        "modifiers": modifiers,
+    }
+    up = {
+        "type": "keyUp",
+        "key": char,
+        "code": code,
+        "windowsVirtualKeyCode": vk,
+        "modifiers": modifiers,
+    }
+    return down, up
+
+
+def keystroke_schedule(
+    text: str,
+    rng: RandomSource = None,
+    wpm: float = defaultWpm,
+    mistakes: float = defaultMistakes,
+) -> Tuple[np.ndarray, List[Dict]]:
+    """Plan the key events that type text like a human.
+
+    Returns the time in seconds at which each event is sent, in increasing order,
+    and the params of the Input.dispatchKeyEvent events. Intervals between keys
+    are log-normal around the typing speed, shorter for frequent letter pairs and
+    longer for shifted keys and punctuation. Shift goes down a little before a run
+    of shifted characters and comes up after it. Words come in bursts separated
+    by the odd pause, and a few letters are mistyped as a neighbouring key,
+    noticed and erased with Backspace. All the random draws are made at once, so
+    the same rng gives the same schedule.
+    """
+    interval = 12 / wpm
+    random = randomBlock(rng, 12 * len(text)).reshape(-1, 12)
+    # Log-normal factors from a Box-Muller transform of two uniform draws
+    spread = np.exp(
+        0.3
+        * np.sqrt(-2 * np.log1p(-random[:, 0]))
+        * np.cos(2 * np.pi * random[:, 1])
+    ).tolist()
+
+    timestamps: List[float] = []
+    events: List[Dict] = []
+    # The last key pressed, when it went down and when it is released
+    last_key = None
+    pressed = released = -math.inf
+    shift_held = False
+
+    def press(char: str, at: float, u: float, shift_u: List[float]) -> None:
+        nonlocal last_key, pressed, released, shift_held
+        down, up = key_events(char)
+        shifted = down.get("modifiers") == shiftModifier
+        if shift_held and not shifted:
+            release_shift(shift_u[1])
+        # Fast keys overlap, but a key can't go down again before it is released
+        at = max(at, pressed + 0.03)
+        if down["key"] == last_key:
+            at = max(at, released + 0.01)
+        if shifted and not shift_held:
+            # Shift goes down once the previous key is up, the key follows once
+            # it is held
+            shift_at = max(at - 0.03 - 0.05 * shift_u[0], released + 0.01, 0.0)
+            timestamps.append(shift_at)
+            events.append(dict(shiftDown))
+            shift_held = True
+            at = max(at, shift_at + 0.02)
+        hold = 0.05 + 0.06 * u
+        timestamps.extend((at, at + hold))
+        events.extend((down, up))
+        last_key, pressed, released = down["key"], at, at + hold
+
+    def release_shift(u: float) -> None:
+        nonlocal pressed, shift_held
+        at = released + 0.01 + 0.04 * u
+        timestamps.append(at)
+        events.append(dict(shiftUp))
+        shift_held = False
+        # The next key waits for Shift to be up
+        pressed = max(pressed, at - 0.03)
+
+    now = 0.0
+    previous = ""
+    for i, char in enumerate(text):
+        u = random[i].tolist()
+        delay = interval * spread[i]
+        if (previous + char).lower() in _fastDigraphs:
+            delay *= 0.7
+        if char in _layout and _layout[char][2]:
+            delay *= 1.3
+        elif not char.isalnum() and char != " ":
+            delay *= 1.4
+        if previous == " " and u[2] < thinkingPause:
+            delay += 0.4 + 0.8 * u[3]
+        now = now + delay if i else 0.0
+
+        neighbours = _neighbours.get(char.lower())
+        if neighbours and u[4] < mistakes:
+            typo = neighbours[int(u[5] * len(neighbours))]
+            press(typo.upper() if char.isupper() else typo, now, u[6], u[10:])
+            # Notice the typo, erase it and type the right key
+            now = pressed + 0.2 + 0.3 * u[7]
+            press("\b", now, u[8], u[10:])
+            now = pressed + interval * spread[i]
+        press(char, now, u[9], u[10:])
+        now = pressed
+        previous = char
+    if shift_held:
+        release_shift(u[11])
+
+    order = np.argsort(timestamps, kind="stable")
+    return np.asarray(timestamps)[order], [events[i] for i in order]
+
+
+def typed_text(events: List[Dict]) -> str:
+    """The text key events leave in a field, without the typos they erased"""
+    typed: List[str] = []
+    for event in events:
+        if event["type"] == "keyDown" and "text" in event:
+            typed.append(event["text"])
+        elif event["type"] == "rawKeyDown" and event["key"] == "Backspace" and typed:
+            typed.pop()
+    return "".join(typed)
+
+
+def keystroke_playback(
+    timestamps: np.ndarray,
+    events: List[Dict],
+    clock: Callable[[], float] = time.monotonic,
+) -> Iterator[Tuple[float, Dict]]:
+    """Schedule key events against a monotonic clock.
+
+    Yields (delay, event): wait delay seconds, then send the event. Late events
+    are sent right away, none is dropped.
+    """
+    start = clock()
+    for timestamp, event in zip(timestamps.tolist(), events):
+        yield max(0.0, timestamp - (clock() - start)), event
@@ -1,10 +1,48 @@
-import bezier
 import math
 import random
-from typing import Tuple, List, Optional
+import numpy as np
+from typing import TYPE_CHECKING, Tuple, List, Optional, Union
+
+if TYPE_CHECKING:
+    import bezier
+
+# Anything accepted as the ``rng`` argument: a generator or a seed for a new one
+RandomSource = Union[np.random.Generator, random.Random, int, None]
+
+_default_rng = np.random.default_rng()
+
+
+def getRng(rng: RandomSource = None) -> Union[np.random.Generator, random.Random]:
+    """Get a random generator from a generator or a seed.
+
+    ``None`` gives the shared process-wide default generator.
+    """
+    if rng is None:
+        return _default_rng
+    if isinstance(rng, (np.random.Generator, random.Random)):
+        return rng
+    return np.random.default_rng(rng)
+
+
+def spawnSeed(rng: RandomSource = None) -> int:
+    """Draw a seed for a new generator, e.g. one used in another process"""
+    rng = getRng(rng)
+    if isinstance(rng, np.random.Generator):
+        return int(rng.integers(2**63))
+    return rng.getrandbits(63)
+
+
+def randomBlock(rng: RandomSource, size: int) -> np.ndarray:
+    """Draw size uniform samples in [0, 1) with a single generator call"""
+    rng = getRng(rng)
+    if isinstance(rng, np.random.Generator):
+        return rng.random(size)
+    return np.array([rng.random() for _ in range(size)])
 
 
 class Vector:
+    __slots__ = ("x", "y")
+
     def __init__(self, x: float, y: float):
         self.x = x
         self.y = y
@@ -12,6 +50,18 @@ class Vector:
     def __repr__(self):
         return "x: {}, y: {}".format(self.x, self.y)
 
+    # Read access like the {"x": ..., "y": ...} dicts paths used to be made of,
+    # dict(v) works as well
+    def keys(self) -> Tuple[str, str]:
+        return self.__slots__
+
+    def __getitem__(self, key: str) -> float:
+        if key == "x":
+            return self.x
+        if key == "y":
+            return self.y
+        raise KeyError(key)
+
 
 origin = Vector(0, 0)
 
@@ -52,54 +102,152 @@ def setMagnitude(a: Vector, amount: float) -> Vector:
     return mult(unit(a), amount)
 
 
-def randomVectorOnLine(a: Vector, b: Vector) -> Vector:
+def randomVectorOnLine(
+    a: Vector, b: Vector, rng: RandomSource = None, multiplier: Optional[float] = None
+) -> Vector:
     vec = direction(a, b)
-    multiplier = random.random()
+    if multiplier is None:
+        multiplier = getRng(rng).random()
     return add(a, mult(vec, multiplier))
 
 
-def randomNormalLine(a: Vector, b: Vector, range_: float) -> Tuple[Vector, Vector]:
-    randMid = randomVectorOnLine(a, b)
+def randomNormalLine(
+    a: Vector,
+    b: Vector,
+    range_: float,
+    rng: RandomSource = None,
+    multiplier: Optional[float] = None,
+) -> Tuple[Vector, Vector]:
+    randMid = randomVectorOnLine(a, b, rng, multiplier)
     normalV = setMagnitude(perpendicular(direction(a, randMid)), range_)
     return randMid, normalV
 
 
-def generateBezierAnchors(a: Vector, b: Vector, spread: float) -> List[Vector]:
-    side = 1 if round(random.random()) == 1 else -1
-
-    def calc() -> Vector:
-        randMid, normalV = randomNormalLine(a, b, spread)
+def generateBezierAnchors(
+    a: Vector,
+    b: Vector,
+    spread: float,
+    rng: RandomSource = None,
+    uniforms: Optional[List[float]] = None,
+) -> List[Vector]:
+    # Same sample layout as bezierNodesBatch: side, then (line, normal) per anchor
+    if uniforms is None:
+        uniforms = randomBlock(rng, 5).tolist()
+    side_, *multipliers = uniforms
+    side = 1 if round(side_) == 1 else -1
+
+    def calc(line: float, normal: float) -> Vector:
+        randMid, normalV = randomNormalLine(a, b, spread, multiplier=line)
         choice = mult(normalV, side)
-        return randomVectorOnLine(randMid, add(randMid, choice))
+        return randomVectorOnLine(randMid, add(randMid, choice), multiplier=normal)
 
-    return sorted([calc(), calc()], key=lambda vec: vec.x)
+    return sorted(
+        [calc(*multipliers[0:2]), calc(*multipliers[2:4])], key=lambda vec: vec.x
+    )
 
 
 def clamp(target: float, min_: float, max_: float) -> float:
     return min(max_, max(min_, target))
 
 
-def overshoot(coordinate: Vector, radius: float) -> Vector:
-    a = random.random() * 2 * math.pi
-    rad = radius * math.sqrt(random.random())
+def overshoot(coordinate: Vector, radius: float, rng: RandomSource = None) -> Vector:
+    angle, distance = randomBlock(rng, 2).tolist()
+    a = angle * 2 * math.pi
+    rad = radius * math.sqrt(distance)
     vector = Vector(rad * math.cos(a), rad * math.sin(a))
     return add(coordinate, vector)
 
 
-def bezierCurve(
-    start: Vector, finish: Vector, overrideSpread: Optional[float]
-) -> bezier.curve.Curve:
+# Cubic Bernstein basis in power form: B(s) = [1, s, s^2, s^3] @ BERNSTEIN @ nodes
+BERNSTEIN = np.array(
+    [
+        [1.0, 0.0, 0.0, 0.0],
+        [-3.0, 3.0, 0.0, 0.0],
+        [3.0, -6.0, 3.0, 0.0],
+        [-1.0, 3.0, -3.0, 1.0],
+    ]
+)
+# Gauss-Legendre nodes and weights on [0, 1] used for the arc length estimate.
+# The speed of a curve with a near cusp is not smooth, 32 nodes keep the error
+# within 0.2% for any cubic and within 0.003% for the curves paths are made of
+_GL_NODES, _GL_WEIGHTS = np.polynomial.legendre.leggauss(32)
+_GL_NODES = (_GL_NODES + 1) / 2
+_GL_WEIGHTS = _GL_WEIGHTS / 2
+
+
+def bezierNodes(
+    start: Vector,
+    finish: Vector,
+    overrideSpread: Optional[float],
+    rng: RandomSource = None,
+    uniforms: Optional[List[float]] = None,
+) -> np.ndarray:
+    """Get the (4, 2) control points of a random cubic curve between two points"""
     min_ = 2
     max_ = 200
     vec = direction(start, finish)
     length = magnitude(vec)
     spread = clamp(length, min_, max_)
     anchors = generateBezierAnchors(
-        start, finish, overrideSpread if overrideSpread is not None else spread
+        start,
+        finish,
+        overrideSpread if overrideSpread is not None else spread,
+        rng,
+        uniforms,
     )
     all_vectors = [start] + anchors + [finish]
-    nodes = [
-        [el.x for el in all_vectors],
-        [el.y for el in all_vectors],
-    ]
-    return bezier.curve.Curve.from_nodes(nodes)
+    return np.array([[el.x, el.y] for el in all_vectors], dtype=np.float64)
+
+
+def bezierEvaluate(nodes: np.ndarray, s_vals: np.ndarray) -> np.ndarray:
+    """Evaluate a cubic curve at the parameters s_vals, giving a (N, 2) array"""
+    powers = np.power.outer(s_vals, np.arange(4))
+    return powers @ (BERNSTEIN @ nodes)
+
+
+def bezierLength(nodes: np.ndarray) -> Union[float, np.ndarray]:
+    """Estimate the arc length of (4, 2) or (M, 4, 2) cubic curves with
+    Gauss-Legendre quadrature"""
+    # The derivative is a quadratic curve on the differences of the nodes
+    diffs = 3 * np.diff(nodes, axis=-2)
+    s = _GL_NODES
+    basis = np.stack([(1 - s) ** 2, 2 * s * (1 - s), s ** 2], axis=1)
+    derivative = basis @ diffs
+    speed = np.hypot(derivative[..., 0], derivative[..., 1])
+    return speed @ _GL_WEIGHTS
+
+
+def bezierNodesBatch(
+    starts: np.ndarray, ends: np.ndarray, spreads: np.ndarray, uniforms: np.ndarray
+) -> np.ndarray:
+    """Vectorized bezierNodes for M pairs, giving a (M, 4, 2) array.
+
+    ``uniforms`` is a (M, 5) block of uniform samples in [0, 1): the side of the
+    line the anchors are on, then the position along the line and the offset
+    along the normal for each of the two anchors.
+    """
+    vec = ends - starts
+    length = np.hypot(vec[:, 0], vec[:, 1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unit_ = np.where(length[:, None] > 0, vec / length[:, None], 0.0)
+    side = np.where(np.round(uniforms[:, 0]) == 1, 1.0, -1.0)
+    normal = np.stack([unit_[:, 1], -unit_[:, 0]], axis=1) * (spreads * side)[:, None]
+    mids = starts[:, None, :] + vec[:, None, :] * uniforms[:, [1, 3], None]
+    anchors = mids + normal[:, None, :] * uniforms[:, [2, 4], None]
+    # Keep the anchors ordered by x, like generateBezierAnchors
+    swap = anchors[:, 0, 0] > anchors[:, 1, 0]
+    anchors[swap] = anchors[swap, ::-1]
+    return np.concatenate([starts[:, None, :], anchors, ends[:, None, :]], axis=1)
+
+
+def bezierCurve(
+    start: Vector,
+    finish: Vector,
+    overrideSpread: Optional[float],
+    rng: RandomSource = None,
+) -> "bezier.curve.Curve":
+    """Build a bezier.curve.Curve, requires the optional bezier package"""
+    import bezier
+
+    nodes = bezierNodes(start, finish, overrideSpread, rng)
+    return bezier.curve.Curve.from_nodes(np.asfortranarray(nodes.T))
@@ -0,0 +1,230 @@
+import contextlib
+import threading
+import time
+from bisect import bisect_left
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    ContextManager,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+)
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Phases timed by the cursors. "path" only covers planning a path, the curve is
+# evaluated lazily while it is sent and that time counts towards "dispatch".
+# "drag" runs from press to release and includes the path and dispatch phases.
+PHASES = (
+    "wait_for_selector",
+    "query",
+    "scroll",
+    "bounding_box",
+    "path",
+    "dispatch",
+    "click",
+    "post_click_sleep",
+    "drag",
+    "type",
+)
+COUNTERS = (
+    "moves",
+    "failed_moves",
+    "overshoots",
+    "clicks",
+    "drags",
+    "scrolls",
+    "keystrokes",
+    "points_dispatched",
+    "dispatch_errors",
+)
+# Last values, set by cursors with adaptive density
+GAUGES = ("path_density", "dispatch_seconds_per_point")
+defaultBuckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+PhaseCallback = Callable[[str, float], None]
+
+_disabled = contextlib.nullcontext()
+
+
+class _Timer:
+    __slots__ = ("metrics", "phase", "started")
+
+    def __init__(self, metrics: "CursorMetrics", phase: str):
+        self.metrics = metrics
+        self.phase = phase
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.metrics.observe(self.phase, time.perf_counter() - self.started)
+
+
+class CursorMetrics:
+    """Counters and per-phase timings of cursor actions.
+
+    Assign an instance to cursor.metrics to enable instrumentation, cursors skip
+    it entirely while the attribute is None. One instance can be shared by many
+    cursors to aggregate them, labels are attached to every exported sample.
+    Every observed phase is also passed to the callbacks as (phase, seconds).
+    """
+
+    def __init__(
+        self,
+        labels: Optional[Dict[str, str]] = None,
+        buckets: Sequence[float] = defaultBuckets,
+    ):
+        self.labels = dict(labels or {})
+        self.buckets = tuple(sorted(buckets))
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.gauges: Dict[str, float] = {}
+        self.callbacks: List[PhaseCallback] = []
+        self._counts: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def set(self, gauge: str, value: float) -> None:
+        with self._lock:
+            self.gauges[gauge] = value
+
+    def observe(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            counts = self._counts.get(phase)
+            if counts is None:
+                # One slot per bucket plus +Inf
+                counts = self._counts[phase] = [0] * (len(self.buckets) + 1)
+                self._sums[phase] = 0.0
+            counts[bisect_left(self.buckets, seconds)] += 1
+            self._sums[phase] += seconds
+        for callback in self.callbacks:
+            callback(phase, seconds)
+
+    def timer(self, phase: str) -> _Timer:
+        """Context manager observing the time spent in its block as phase"""
+        return _Timer(self, phase)
+
+    def snapshot(self) -> Dict:
+        """Get the counters, the gauges and the count and total seconds of every phase"""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "phases": {
+                    name: {"count": sum(counts), "seconds": self._sums[name]}
+                    for name, counts in self._counts.items()
+                },
+            }
+
+    def prometheus(self, prefix: str = "ghost_cursor") -> str:
+        return prometheus_text([self], prefix)
+
+
+def phase(metrics: Optional[CursorMetrics], name: str) -> ContextManager:
+    """Time a block into metrics, or do nothing when metrics is None"""
+    if metrics is None:
+        return _disabled
+    return _Timer(metrics, name)
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        '{}="{}"'.format(
+            k, str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        for k, v in sorted(labels.items())
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def prometheus_text(
+    metrics: Sequence[CursorMetrics], prefix: str = "ghost_cursor"
+) -> str:
+    """Render metrics in the Prometheus text exposition format.
+
+    Instances sharing the same labels are summed up by the scraper, so give every
+    instance distinct labels when exporting several.
+    """
+    lines = []
+    for counter in COUNTERS:
+        name = "{}_{}_total".format(prefix, counter)
+        lines.append("# TYPE {} counter".format(name))
+        for m in metrics:
+            with m._lock:
+                value = m.counters.get(counter, 0)
+            lines.append("{}{} {}".format(name, _labels(m.labels), value))
+
+    for gauge in GAUGES:
+        name = "{}_{}".format(prefix, gauge)
+        values = []
+        for m in metrics:
+            with m._lock:
+                value = m.gauges.get(gauge)
+            if value is not None:
+                values.append("{}{} {}".format(name, _labels(m.labels), value))
+        if values:
+            lines.append("# TYPE {} gauge".format(name))
+            lines.extend(values)
+
+    name = "{}_phase_seconds".format(prefix)
+    lines.append("# TYPE {} histogram".format(name))
+    for m in metrics:
+        with m._lock:
+            phases = {p: (list(c), m._sums[p]) for p, c in m._counts.items()}
+        for phase_name, (counts, total) in phases.items():
+            labels = dict(m.labels, phase=phase_name)
+            cumulative = 0
+            for le, count in zip(m.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = dict(labels, le="+Inf" if le == float("inf") else le)
+                lines.append(
+                    "{}_bucket{} {}".format(name, _labels(bucket_labels), cumulative)
+                )
+            lines.append("{}_sum{} {}".format(name, _labels(labels), total))
+            lines.append("{}_count{} {}".format(name, _labels(labels), cumulative))
+    return "\n".join(lines) + "\n"
+
+
+def serve_metrics(
+    *metrics: CursorMetrics,
+    host: str = "127.0.0.1",
+    port: int = 9464,
+    prefix: str = "ghost_cursor",
+) -> "ThreadingHTTPServer":
+    """Serve metrics on http://host:port/metrics from a daemon thread.
+
+    Prometheus, or an OpenTelemetry collector with a prometheus receiver, can
+    scrape it. Call shutdown() on the returned server to stop it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text(metrics, prefix).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(
+        target=server.serve_forever, name="ghost-cursor-metrics", daemon=True
+    ).start()
+    return server
@@ -0,0 +1,241 @@
+import math
+from abc import ABC, abstractmethod
+import numpy as np
+from typing import Dict, Optional, Tuple, Union
+from python_ghost_cursor.shared._math import (
+    Vector,
+    bezierEvaluate,
+    clamp,
+    RandomSource,
+    randomBlock,
+)
+from python_ghost_cursor.shared._spoof import _path_plan, path_steps, defaultWidth
+
+
+def _target(end: Union[Dict, Vector]) -> Tuple[Vector, float]:
+    if isinstance(end, dict):
+        return Vector(end["x"], end["y"]), end["width"]
+    return end, defaultWidth
+
+
+def _spread(length: float, spreadOverride: Optional[float]) -> float:
+    # Same default as bezierNodes: as far off the line as the move is long, up to 200
+    return spreadOverride if spreadOverride is not None else clamp(length, 2, 200)
+
+
+class MotionModel(ABC):
+    """Shape of the paths of a cursor.
+
+    points() returns the unclamped (N, 2) points of one path from start to end,
+    end being a point or a box whose width makes the path longer or shorter like
+    Fitts's law does. The random draws of a path are made in one block, so a
+    seeded generator gives the same paths every run.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def points(
+        self,
+        start: Vector,
+        end: Union[Dict, Vector],
+        spreadOverride: Optional[float] = None,
+        rng: RandomSource = None,
+        density: float = 1.0,
+    ) -> np.ndarray:
+        ...
+
+    def __repr__(self):
+        return "{}()".format(type(self).__name__)
+
+
+class BezierModel(MotionModel):
+    """A cubic Bezier curve with two random anchors, the default.
+
+    One polynomial evaluation per point.
+    """
+
+    name = "bezier"
+
+    def points(self, start, end, spreadOverride=None, rng=None, density=1.0):
+        nodes, steps = _path_plan(start, end, spreadOverride, rng, density)
+        return bezierEvaluate(nodes, np.linspace(0.0, 1.0, steps))
+
+
+class MinimumJerkModel(MotionModel):
+    """A slightly bowed line, travelled on a minimum-jerk profile.
+
+    Points are spaced like the positions of a minimum-jerk movement sampled at
+    even intervals: close together at both ends, far apart half way. The
+    cheapest model, a handful of vectorized operations per path.
+    """
+
+    name = "minimum_jerk"
+
+    def points(self, start, end, spreadOverride=None, rng=None, density=1.0):
+        end, width = _target(end)
+        side, skew, base = randomBlock(rng, 3).tolist()
+        vec = np.array([end.x - start.x, end.y - start.y])
+        length = math.hypot(*vec)
+        steps = path_steps(length, width, base, density)
+        tau = np.linspace(0.0, 1.0, steps)
+        progress = tau**3 * (10 - 15 * tau + 6 * tau**2)
+        # The bow peaks somewhere in the middle of the move, on a random side
+        bow = _spread(length, spreadOverride) * (side - 0.5)
+        offset = bow * np.sin(np.pi * progress ** (0.6 + 0.8 * skew))
+        normal = np.array([vec[1], -vec[0]]) / length if length else np.zeros(2)
+        return (
+            np.array([start.x, start.y])
+            + np.outer(progress, vec)
+            + np.outer(offset, normal)
+        )
+
+
+class WindMouseModel(MotionModel):
+    """Physics-like paths: gravity pulls the cursor to the target, wind pushes it around.
+
+    Each step depends on the position and speed the previous one left, so the
+    path is built in a Python loop, with all the random draws made up front.
+    The most expensive model per point. The wind blows less for shorter moves
+    and smaller spreads (overshoot corrections), density shortens the steps.
+    """
+
+    name = "windmouse"
+
+    def __init__(
+        self,
+        gravity: float = 9,
+        wind: float = 3,
+        max_step: float = 15,
+        target_area: float = 12,
+    ):
+        self.gravity = gravity
+        self.wind = wind
+        self.max_step = max_step
+        self.target_area = target_area
+
+    def points(self, start, end, spreadOverride=None, rng=None, density=1.0):
+        end, _ = _target(end)
+        length = math.hypot(end.x - start.x, end.y - start.y)
+        wind = self.wind * _spread(length, spreadOverride) / 200
+        max_step = self.max_step / density
+        # Enough draws for a path three times as long as the straight line, it
+        # jumps to the target if it runs out
+        limit = math.ceil(3 * length / max_step) + 50
+        random = randomBlock(rng, 3 * limit).tolist()
+        sqrt3 = math.sqrt(3)
+        sqrt5 = math.sqrt(5)
+
+        x, y = float(start.x), float(start.y)
+        vx = vy = wx = wy = 0.0
+        xs = [x]
+        ys = [y]
+        for i in range(limit):
+            dx = end.x - x
+            dy = end.y - y
+            distance = math.hypot(dx, dy)
+            if distance < 1:
+                break
+            u1, u2, u3 = random[3 * i : 3 * i + 3]
+            if distance >= self.target_area:
+                strength = min(wind, distance)
+                wx = wx / sqrt3 + (2 * u1 - 1) * strength / sqrt5
+                wy = wy / sqrt3 + (2 * u2 - 1) * strength / sqrt5
+            else:
+                # Close to the target: the wind dies down and the cursor slows
+                wx /= sqrt3
+                wy /= sqrt3
+                max_step = 3 + 3 * u3 if max_step < 3 else max_step / sqrt5
+            vx += wx + self.gravity * dx / distance
+            vy += wy + self.gravity * dy / distance
+            speed = math.hypot(vx, vy)
+            if speed > max_step:
+                clipped = max_step / 2 + u3 * max_step / 2
+                vx = vx / speed * clipped
+                vy = vy / speed * clipped
+            x += vx
+            y += vy
+            xs.append(x)
+            ys.append(y)
+        xs.append(end.x)
+        ys.append(end.y)
+        return np.column_stack((xs, ys))
+
+
+# Catmull-Rom basis in power form: P(t) = [1, t, t^2, t^3] @ CATMULL_ROM @ [p0, p1, p2, p3]
+CATMULL_ROM = 0.5 * np.array(
+    [
+        [0.0, 2.0, 0.0, 0.0],
+        [-1.0, 0.0, 1.0, 0.0],
+        [2.0, -5.0, 4.0, -1.0],
+        [-1.0, 3.0, -3.0, 1.0],
+    ]
+)
+
+
+class CatmullRomModel(MotionModel):
+    """A Catmull-Rom spline through random waypoints scattered around the line.
+
+    Points are spread over the segments in proportion to their length and all
+    the segments are evaluated at once, a little more work per point than the
+    Bezier model.
+    """
+
+    name = "spline"
+
+    def __init__(self, waypoints: int = 2):
+        self.waypoints = waypoints
+
+    def points(self, start, end, spreadOverride=None, rng=None, density=1.0):
+        end, width = _target(end)
+        count = self.waypoints
+        random = randomBlock(rng, 2 * count + 1)
+        a = np.array([start.x, start.y], dtype=np.float64)
+        b = np.array([end.x, end.y], dtype=np.float64)
+        vec = b - a
+        length = math.hypot(*vec)
+        normal = np.array([vec[1], -vec[0]]) / length if length else np.zeros(2)
+        # Waypoint i is near (i + 1) / (count + 1) of the way, so they stay in order
+        along = (np.arange(count) + 0.7 + 0.6 * random[:count]) / (count + 1)
+        across = _spread(length, spreadOverride) * (random[count : 2 * count] - 0.5)
+        waypoints = a + np.outer(along, vec) + np.outer(across, normal)
+        # The end points are repeated so the spline starts and ends on them
+        nodes = np.concatenate([[a, a], waypoints, [b, b]])
+
+        chords = np.hypot(*np.diff(nodes[1:-1], axis=0).T)
+        steps = path_steps(chords.sum(), width, random[-1], density)
+        bounds = np.concatenate([[0.0], np.cumsum(chords)])
+        if bounds[-1] > 0:
+            bounds /= bounds[-1]
+        else:
+            bounds = np.linspace(0.0, 1.0, len(bounds))
+        s = np.linspace(0.0, 1.0, steps)
+        segment = np.clip(np.searchsorted(bounds, s, "right") - 1, 0, len(chords) - 1)
+        t = (s - bounds[segment]) / np.maximum(np.diff(bounds)[segment], 1e-12)
+        windows = nodes[np.arange(len(chords))[:, None] + np.arange(4)]
+        coefficients = CATMULL_ROM @ windows
+        return np.einsum(
+            "tk,tkd->td", np.power.outer(t, np.arange(4)), coefficients[segment]
+        )
+
+
+motionModels: Dict[str, MotionModel] = {
+    model.name: model
+    for model in (BezierModel(), MinimumJerkModel(), WindMouseModel(), CatmullRomModel())
+}
+
+
+def motion_model(model: Union[str, MotionModel, None] = None) -> MotionModel:
+    """Get a MotionModel from itself or its name in motionModels, None for the default"""
+    if model is None:
+        return motionModels["bezier"]
+    if isinstance(model, MotionModel):
+        return model
+    try:
+        return motionModels[model]
+    except KeyError:
+        raise ValueError(
+            "Unknown motion model {!r}, expected one of {}".format(
+                model, ", ".join(motionModels)
+            )
+        ) from None
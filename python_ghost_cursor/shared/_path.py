@@ -0,0 +1,68 @@
+import numpy as np
+from typing import Dict, Iterator, List, Sequence, Union, overload
+from python_ghost_cursor.shared._math import Vector
+
+
+class Path(Sequence):
+    """The points of a path, stored in a single (N, 2) float64 array.
+
+    Indexing gives a Vector made on access, slicing gives a Path viewing the same
+    array. np.asarray(path) is the array itself, to_list() and to_json() convert
+    straight from it.
+    """
+
+    __slots__ = ("points",)
+
+    def __init__(self, points: Union[np.ndarray, Sequence[Vector]]):
+        if not isinstance(points, np.ndarray):
+            points = [[v.x, v.y] for v in points]
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    @overload
+    def __getitem__(self, index: int) -> Vector:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "Path":
+        ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Path(self.points[index])
+        x, y = self.points[index].tolist()
+        return Vector(x, y)
+
+    def __iter__(self) -> Iterator[Vector]:
+        return (Vector(x, y) for x, y in self.points.tolist())
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        # NumPy 2 protocol: copy=True always copies, copy=False never does
+        if dtype is None or np.dtype(dtype) == self.points.dtype:
+            return self.points.copy() if copy else self.points
+        if copy is False:
+            raise ValueError(
+                "Unable to avoid a copy while converting a Path to {}".format(
+                    np.dtype(dtype)
+                )
+            )
+        return self.points.astype(dtype)
+
+    def __repr__(self) -> str:
+        return "Path({} points)".format(len(self.points))
+
+    def to_list(self) -> List[Dict[str, float]]:
+        """Get the points as a list of {"x": ..., "y": ...} dicts"""
+        return [{"x": x, "y": y} for x, y in self.points.tolist()]
+
+    def to_json(self) -> str:
+        """Get the points as a JSON array of {"x": ..., "y": ...} objects"""
+        return (
+            "["
+            + ", ".join(
+                '{{"x": {!r}, "y": {!r}}}'.format(x, y) for x, y in self.points.tolist()
+            )
+            + "]"
+        )
@@ -0,0 +1,182 @@
+import os
+import time
+import numpy as np
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
+from python_ghost_cursor.shared._math import Vector
+from python_ghost_cursor.shared._path import Path
+from python_ghost_cursor.shared._timing import as_points, movement_timestamps
+
+# A trajectory log is a 16 byte header (magic, version, record size) followed by
+# fixed size little-endian records, so the records can be memory-mapped as is
+magic = b"GHSTCRSR"
+version = 1
+recordDtype = np.dtype(
+    [("time", "<f8"), ("x", "<f8"), ("y", "<f8"), ("path", "<u4"), ("kind", "u1")],
+    align=False,
+)
+headerDtype = np.dtype([("magic", "S8"), ("version", "<u4"), ("size", "<u4")])
+
+# Record kinds: a point of a path, the mouse button going down or up
+MOVE = 0
+DOWN = 1
+UP = 2
+
+
+def _header() -> bytes:
+    return np.array([(magic, version, recordDtype.itemsize)], headerDtype).tobytes()
+
+
+def _record_count(filename: Union[str, os.PathLike]) -> int:
+    """Number of whole records in a log, a record torn by a crash is not counted"""
+    return (os.path.getsize(filename) - headerDtype.itemsize) // recordDtype.itemsize
+
+
+def read_trajectories(filename: Union[str, os.PathLike]) -> np.ndarray:
+    """Memory-map the records of a trajectory log, without reading them.
+
+    The result is a structured array with time (seconds since the recording
+    started), x, y, path (the number of the path a point belongs to) and kind
+    (MOVE, DOWN or UP) fields. A partial record at the end of the log, from a
+    recording that was cut short, is left out.
+    """
+    header = np.fromfile(filename, headerDtype, count=1)
+    if len(header) == 0 or header[0]["magic"] != magic:
+        raise ValueError("{} is not a trajectory log".format(filename))
+    if header[0]["version"] != version or header[0]["size"] != recordDtype.itemsize:
+        raise ValueError(
+            "{} has version {}, expected {}".format(
+                filename, header[0]["version"], version
+            )
+        )
+    count = _record_count(filename)
+    if count == 0:
+        return np.zeros(0, recordDtype)
+    return np.memmap(
+        filename, recordDtype, mode="r", offset=headerDtype.itemsize, shape=(count,)
+    )
+
+
+def records_from_path(
+    points: Union[np.ndarray, Iterable[Vector]],
+    timestamps: Optional[np.ndarray] = None,
+    path: int = 0,
+) -> np.ndarray:
+    """Make MOVE records from the points of a path, e.g. an externally captured trace.
+
+    Without timestamps, the points are timed like realtime dispatch does.
+    """
+    points = as_points(points)
+    records = np.zeros(len(points), recordDtype)
+    records["time"] = movement_timestamps(points) if timestamps is None else timestamps
+    records["x"] = points[:, 0]
+    records["y"] = points[:, 1]
+    records["path"] = path
+    records["kind"] = MOVE
+    return records
+
+
+def segments(records: np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+    """Split records into runs of the same kind and path, as (kind, records) views"""
+    if len(records) == 0:
+        return
+    changes = np.flatnonzero(
+        (np.diff(records["kind"]) != 0) | (np.diff(records["path"]) != 0)
+    )
+    bounds = np.concatenate([[0], changes + 1, [len(records)]])
+    for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        yield int(records["kind"][start]), records[start:end]
+
+
+def segment_points(records: np.ndarray) -> Path:
+    """Get the points of MOVE records as a Path"""
+    return Path(np.column_stack((records["x"], records["y"])))
+
+
+class TrajectoryRecorder:
+    """Append the paths and clicks of cursors to a trajectory log.
+
+    Assign it to cursor.recorder. Every path is written when its dispatch ends,
+    with the points the backend handed to the browser and when (their scheduled
+    time for paced dispatches, which drop overdue points), and mouse downs and
+    ups are written as they happen. Appending to an existing log continues its
+    clock and path numbers, after dropping a partial record at its end.
+    """
+
+    def __init__(self, filename: Union[str, os.PathLike]):
+        self.filename = filename
+        self.path = 0
+        self._offset = 0.0
+        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+            existing = read_trajectories(filename)
+            if len(existing):
+                self.path = int(existing["path"][-1]) + 1
+                self._offset = float(existing["time"][-1])
+            del existing
+            # Appending after a torn record would shift every record that follows
+            os.truncate(
+                filename,
+                headerDtype.itemsize + _record_count(filename) * recordDtype.itemsize,
+            )
+        self._file: BinaryIO = open(filename, "ab")
+        if self._file.tell() == 0:
+            self._file.write(_header())
+        self._started = time.monotonic()
+        self._pending: List[Tuple[float, float, float]] = []
+        self._path_started = 0.0
+
+    def __enter__(self) -> "TrajectoryRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def now(self) -> float:
+        return self._offset + time.monotonic() - self._started
+
+    def sent(self, position: Vector, due: Optional[float] = None) -> None:
+        """Note that the mouse was sent to position.
+
+        due is the time of the point in its path's schedule, in seconds after the
+        first point, for points sent on a schedule.
+        """
+        now = self.now()
+        if not self._pending:
+            self._path_started = now - (due or 0.0)
+        if due is not None:
+            now = self._path_started + due
+        self._pending.append((now, position.x, position.y))
+
+    def end_path(self) -> None:
+        """Write the points sent since the last path"""
+        if not self._pending:
+            return
+        times, xs, ys = np.array(self._pending, dtype=np.float64).T
+        self._pending.clear()
+        records = np.zeros(len(times), recordDtype)
+        records["time"] = times
+        records["x"] = xs
+        records["y"] = ys
+        records["path"] = self.path
+        records["kind"] = MOVE
+        self._append(records)
+        self.path += 1
+
+    def event(self, kind: int, position: Vector) -> None:
+        """Write a DOWN or UP event at position"""
+        record = np.zeros(1, recordDtype)
+        record[0] = (self.now(), position.x, position.y, self.path, kind)
+        self._append(record)
+
+    def write(self, records: np.ndarray) -> None:
+        """Append records, e.g. from records_from_path, later paths are numbered after them"""
+        records = records.astype(recordDtype, copy=False)
+        self._append(records)
+        if len(records):
+            self.path = max(self.path, int(records["path"].max()) + 1)
+
+    def _append(self, records: np.ndarray) -> None:
+        self._file.write(records.tobytes())
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
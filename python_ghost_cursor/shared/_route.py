@@ -0,0 +1,91 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from python_ghost_cursor.shared._math import Vector, overshoot, RandomSource, getRng
+from python_ghost_cursor.shared._spoof import (
+    path_points,
+    should_overshoot,
+    get_random_box_point,
+)
+from python_ghost_cursor.shared._path import Path
+from python_ghost_cursor.shared._motion import MotionModel
+
+# Get the boxes of the elements matching CSS or XPath ("//") selectors, null for
+# missing ones, and the size of the viewport, in one call
+resolve_boxes_script = """selectors => ({
+    boxes: selectors.map(selector => {
+        const element = selector.includes('//')
+            ? document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+            : document.querySelector(selector)
+        if (!element) {
+            return null
+        }
+        const rect = element.getBoundingClientRect()
+        return {x: rect.x, y: rect.y, width: rect.width, height: rect.height}
+    }),
+    viewport: {width: window.innerWidth, height: window.innerHeight},
+})"""
+
+
+def in_viewport(box: Dict[str, float], viewport: Dict[str, float]) -> bool:
+    """Whether box is entirely inside the viewport"""
+    return (
+        box["x"] >= 0
+        and box["y"] >= 0
+        and box["x"] + box["width"] <= viewport["width"]
+        and box["y"] + box["height"] <= viewport["height"]
+    )
+
+
+def route_segment(
+    start: Vector,
+    box: Dict[str, float],
+    padding_percentage: Optional[float] = None,
+    rng: RandomSource = None,
+    overshoot_radius: float = 120,
+    overshoot_spread: float = 10,
+    model: Union[str, MotionModel, None] = None,
+) -> Tuple[Vector, bool, Path]:
+    """Get the path from start to a random point of box, like GhostCursor.move.
+
+    Returns the point reached, whether the path overshoots it and the path.
+    """
+    destination = get_random_box_point(box, padding_percentage, rng)
+    if not should_overshoot(start, destination):
+        points = path_points(start, destination, rng=rng, model=model)
+        return destination, False, Path(points)
+    to = overshoot(destination, overshoot_radius, rng)
+    correction = dict(box, x=destination.x, y=destination.y)
+    points = np.concatenate(
+        [
+            path_points(start, to, rng=rng, model=model),
+            path_points(to, correction, overshoot_spread, rng, model=model),
+        ]
+    )
+    return destination, True, Path(points)
+
+
+def plan_route(
+    start: Vector,
+    boxes: Sequence[Dict[str, float]],
+    padding_percentage: Optional[float] = None,
+    rng: RandomSource = None,
+    overshoot_radius: float = 120,
+    overshoot_spread: float = 10,
+    model: Union[str, MotionModel, None] = None,
+) -> List[Tuple[Vector, bool, Path]]:
+    """Plan the paths visiting boxes in order from start, see route_segment"""
+    rng = getRng(rng)
+    route = []
+    for box in boxes:
+        segment = route_segment(
+            start,
+            box,
+            padding_percentage,
+            rng,
+            overshoot_radius,
+            overshoot_spread,
+            model,
+        )
+        route.append(segment)
+        start = segment[0]
+    return route
@@ -0,0 +1,94 @@
+import math
+import time
+import numpy as np
+from typing import Callable, Iterator, Tuple
+from python_ghost_cursor.shared._math import RandomSource, randomBlock
+
+# Average distance scrolled by one wheel tick, in pixels
+tickDistance = 80
+maxTicks = 120
+# Scroll duration in seconds is scrollTimeBase + distance / scrollSpeed
+scrollTimeBase = 0.25
+scrollSpeed = 2500
+# How much each interval between two ticks may vary, as a fraction
+tickJitter = 0.3
+# Longest wait for a wheel scroll to come to rest, in milliseconds
+settleTimeout = 500
+
+# Get the [x, y] scroll that brings an element to the middle of the viewport,
+# [0, 0] when it is fully visible already
+scroll_delta_script = """element => {
+    const rect = element.getBoundingClientRect()
+    if (rect.top >= 0 && rect.left >= 0 && rect.bottom <= window.innerHeight && rect.right <= window.innerWidth) {
+        return [0, 0]
+    }
+    return [
+        Math.round(rect.left + rect.width / 2 - window.innerWidth / 2),
+        Math.round(rect.top + rect.height / 2 - window.innerHeight / 2),
+    ]
+}"""
+
+# Resolve once the page stops scrolling: on scrollend, or after two animation
+# frames without a scroll event (browsers without scrollend), or after timeout
+# milliseconds. Scroll events don't bubble, they are caught on the way down
+scroll_settle_script = """timeout => new Promise(resolve => {
+    let quiet = 0
+    const onScroll = () => { quiet = 0 }
+    const done = () => {
+        removeEventListener("scroll", onScroll, true)
+        removeEventListener("scrollend", done, true)
+        clearTimeout(timer)
+        resolve()
+    }
+    const frame = () => {
+        if (++quiet >= 2) done()
+        else requestAnimationFrame(frame)
+    }
+    const timer = setTimeout(done, timeout)
+    addEventListener("scroll", onScroll, true)
+    addEventListener("scrollend", done, true)
+    requestAnimationFrame(frame)
+})"""
+
+
+def wheel_ticks(
+    delta_x: float, delta_y: float, rng: RandomSource = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Plan the wheel events that scroll by (delta_x, delta_y).
+
+    Returns the (N, 2) integer deltas of the ticks, which add up to the whole
+    scroll, and the time in seconds at which each tick is sent. Ticks come at
+    roughly even intervals and their deltas follow a minimum-jerk profile, so the
+    scroll speeds up, peaks half way and slows down before stopping.
+    """
+    distance = math.hypot(delta_x, delta_y)
+    if distance == 0:
+        return np.zeros((0, 2), dtype=np.int64), np.zeros(0)
+    random = randomBlock(rng, 2 + maxTicks)
+    count = math.ceil(distance / tickDistance * (0.8 + 0.4 * random[0]))
+    count = min(maxTicks, max(3, count))
+    duration = (scrollTimeBase + distance / scrollSpeed) * (0.9 + 0.2 * random[1])
+
+    intervals = 1 + tickJitter * (2 * random[2 : 2 + count] - 1)
+    tau = np.concatenate([[0.0], np.cumsum(intervals)])
+    tau /= tau[-1]
+    progress = tau**3 * (10 - 15 * tau + 6 * tau**2)
+    # Round the positions, not the deltas, so rounding errors don't add up
+    positions = np.rint(np.outer(progress, [delta_x, delta_y])).astype(np.int64)
+    deltas = np.diff(positions, axis=0)
+    moving = np.any(deltas != 0, axis=1)
+    return deltas[moving], tau[1:][moving] * duration
+
+
+def wheel_playback(
+    deltas: np.ndarray, timestamps: np.ndarray, clock: Callable[[], float] = time.monotonic
+) -> Iterator[Tuple[float, int, int]]:
+    """Schedule wheel ticks against a monotonic clock.
+
+    Yields (delay, delta_x, delta_y): wait delay seconds, then send the tick.
+    Unlike path points, late ticks are sent right away rather than dropped, so
+    the page still scrolls by the whole distance.
+    """
+    start = clock()
+    for (delta_x, delta_y), timestamp in zip(deltas.tolist(), timestamps.tolist()):
+        yield max(0.0, timestamp - (clock() - start)), delta_x, delta_y
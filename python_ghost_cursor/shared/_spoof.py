@@ -1,47 +1,207 @@
 import math
-import random
 import numpy as np
-from typing import Union, Optional, Dict, List
+from typing import Union, Optional, Dict, List, Tuple, Iterator, TYPE_CHECKING
 from python_ghost_cursor.shared._math import (
     Vector,
     magnitude,
     direction,
-    bezierCurve,
+    bezierNodes,
+    bezierEvaluate,
+    bezierLength,
+    bezierNodesBatch,
+    BERNSTEIN,
+    RandomSource,
+    randomBlock,
 )
+from python_ghost_cursor.shared._path import Path
+
+if TYPE_CHECKING:
+    from python_ghost_cursor.shared._motion import MotionModel
+
+defaultWidth = 100
+minSteps = 25
 
 
 def fitts(distance: float, width: float) -> float:
     a = 0
     b = 2
-    id_ = math.log2(distance / width + 1)
+    id_ = np.log2(distance / width + 1)
     return a + b * id_
 
 
-def path(
-    start: Vector, end: Union[Dict, Vector], spreadOverride: Optional[float] = None
-) -> List[Vector]:
-    defaultWidth = 100
-    minSteps = 25
+def path_steps(length: float, width: float, u: float, density: float = 1.0) -> int:
+    """Number of points of a path of the given length, u is a uniform draw"""
+    baseTime = u * minSteps
+    steps = math.ceil((math.log2(fitts(length, width) + 1) + baseTime) * 3)
+    if density != 1:
+        steps = max(2, math.ceil(steps * density))
+    return steps
+
+
+def _path_plan(
+    start: Vector,
+    end: Union[Dict, Vector],
+    spreadOverride: Optional[float] = None,
+    rng: RandomSource = None,
+    density: float = 1.0,
+) -> Tuple[np.ndarray, int]:
+    """Get the control points and the number of points of a path.
+
+    density scales the number of points, the curve stays the same.
+    """
     if isinstance(end, dict):
         width = end["width"]
         end = Vector(end["x"], end["y"])
     else:
         width = defaultWidth
-    curve = bezierCurve(start, end, spreadOverride)
-    length = curve.length * 0.8
-    baseTime = random.random() * minSteps
-    steps = math.ceil((math.log2(fitts(length, width) + 1) + baseTime) * 3)
+    # One draw per path, laid out like the rows path_batch uses
+    uniforms = randomBlock(rng, 6).tolist()
+    nodes = bezierNodes(start, end, spreadOverride, uniforms=uniforms[:5])
+    length = bezierLength(nodes) * 0.8
+    return nodes, path_steps(length, width, uniforms[5], density)
+
+
+def path_points(
+    start: Vector,
+    end: Union[Dict, Vector],
+    spreadOverride: Optional[float] = None,
+    rng: RandomSource = None,
+    clamp: bool = True,
+    density: float = 1.0,
+    model: Union[str, "MotionModel", None] = None,
+) -> np.ndarray:
+    """Generate a path as a contiguous (N, 2) float64 array of points.
+
+    model is a MotionModel or the name of one, None for the default Bezier curves.
+    """
+    if model is not None:
+        # _motion builds its models on this module
+        from python_ghost_cursor.shared._motion import motion_model
+
+        points = motion_model(model).points(start, end, spreadOverride, rng, density)
+    else:
+        nodes, steps = _path_plan(start, end, spreadOverride, rng, density)
+        points = bezierEvaluate(nodes, np.linspace(0.0, 1.0, steps))
+    return clampPositive(points) if clamp else points
+
+
+def path(
+    start: Vector,
+    end: Union[Dict, Vector],
+    spreadOverride: Optional[float] = None,
+    rng: RandomSource = None,
+    model: Union[str, "MotionModel", None] = None,
+) -> Path:
+    return Path(path_points(start, end, spreadOverride, rng, model=model))
+
+
+def iter_path_chunks(
+    start: Vector,
+    end: Union[Dict, Vector],
+    spreadOverride: Optional[float] = None,
+    rng: RandomSource = None,
+    chunk_size: int = 16,
+    density: float = 1.0,
+    model: Union[str, "MotionModel", None] = None,
+) -> Iterator[np.ndarray]:
+    """Like path_points, but evaluate the curve in (chunk_size, 2) chunks as they are consumed.
+
+    The random draws happen right away, so the path is the same as the one
+    path_points would give for the same generator state. Other models than the
+    default are computed at once and only split in chunks.
+    """
+    if model is not None:
+        points = path_points(start, end, spreadOverride, rng, True, density, model)
+        return (points[i : i + chunk_size] for i in range(0, len(points), chunk_size))
+    nodes, steps = _path_plan(start, end, spreadOverride, rng, density)
+    return _evaluate_chunks(nodes, steps, chunk_size)
+
+
+def _evaluate_chunks(
+    nodes: np.ndarray, steps: int, chunk_size: int
+) -> Iterator[np.ndarray]:
     s_vals = np.linspace(0.0, 1.0, steps)
-    points = curve.evaluate_multi(s_vals)
-    vectors = []
-    for i in range(steps):
-        vectors.append(Vector(points[0][i], points[1][i]))
-    return clampPositive(vectors)
+    for i in range(0, steps, chunk_size):
+        yield clampPositive(bezierEvaluate(nodes, s_vals[i : i + chunk_size]))
+
+
+def iter_path(
+    start: Vector,
+    end: Union[Dict, Vector],
+    spreadOverride: Optional[float] = None,
+    rng: RandomSource = None,
+    chunk_size: int = 16,
+    density: float = 1.0,
+    model: Union[str, "MotionModel", None] = None,
+) -> Iterator[Vector]:
+    """Like path, but yield the points as soon as their chunk is computed"""
+    chunks = iter_path_chunks(
+        start, end, spreadOverride, rng, chunk_size, density, model
+    )
+    return (Vector(x, y) for chunk in chunks for x, y in chunk.tolist())
+
+
+def clampPositive(points: np.ndarray) -> np.ndarray:
+    """Clamp all coordinates of a (N, 2) array to be non-negative, in place"""
+    return np.maximum(points, 0, out=points)
+
 
+def path_batch(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    widths: Optional[Union[float, np.ndarray]] = None,
+    spread: Optional[Union[float, np.ndarray]] = None,
+    seed: Optional[Union[int, np.random.Generator]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Generate paths for M start/end pairs at once.
 
-def clampPositive(vectors: List[Vector]) -> List[Vector]:
-    clamp0 = lambda elem: max(0, elem)
-    return [Vector(clamp0(el.x), clamp0(el.y)) for el in vectors]
+    ``starts`` and ``ends`` are (M, 2) arrays. Returns a flat (total, 2) array of
+    points and a (M + 1,) array of offsets: path i is points[offsets[i]:offsets[i + 1]].
+    """
+    rng = np.random.default_rng(seed)
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+    uniforms = rng.random((len(starts), 6))
+    return _path_batch(starts, ends, widths, spread, uniforms)
+
+
+def _path_batch(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    widths: Optional[Union[float, np.ndarray]],
+    spread: Optional[Union[float, np.ndarray]],
+    uniforms: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    count = len(starts)
+    if widths is None:
+        widths = defaultWidth
+    widths = np.broadcast_to(np.asarray(widths, dtype=np.float64), (count,))
+    if spread is None:
+        spread = np.clip(np.hypot(*(ends - starts).T), 2, 200)
+    spread = np.broadcast_to(np.asarray(spread, dtype=np.float64), (count,))
+
+    nodes = bezierNodesBatch(starts, ends, spread, uniforms[:, :5])
+    length = bezierLength(nodes) * 0.8
+    baseTime = uniforms[:, 5] * minSteps
+    steps = np.ceil((np.log2(fitts(length, widths) + 1) + baseTime) * 3).astype(
+        np.intp
+    )
+
+    offsets = np.zeros(count + 1, dtype=np.intp)
+    np.cumsum(steps, out=offsets[1:])
+    owner = np.repeat(np.arange(count), steps)
+    index = np.arange(offsets[-1]) - offsets[owner]
+    s_vals = index / np.maximum(steps[owner] - 1, 1)
+    coefficients = BERNSTEIN @ nodes
+    points = np.einsum(
+        "tk,tkd->td", np.power.outer(s_vals, np.arange(4)), coefficients[owner]
+    )
+    return clampPositive(points), offsets
+
+
+def split_batch(points: np.ndarray, offsets: np.ndarray) -> List[np.ndarray]:
+    """Split the flat result of path_batch into a list of per-path views"""
+    return np.split(points, offsets[1:-1])
 
 
 overshootThreshold = 500
@@ -51,15 +211,25 @@ def should_overshoot(a: Vector, b: Vector) -> bool:
     return magnitude(direction(a, b)) > overshootThreshold
 
 
-def get_path(start: Dict, end: Dict) -> List[Dict]:
-    vectors = path(Vector(**start), Vector(**end))
-    return [el.__dict__ for el in vectors]
+def get_path(
+    start: Dict,
+    end: Dict,
+    rng: RandomSource = None,
+    model: Union[str, "MotionModel", None] = None,
+) -> Path:
+    """Get a path between two {"x": ..., "y": ...} points.
+
+    Points read like dicts (point["x"]), use to_list() or to_json() to convert.
+    model picks the motion model, see shared._motion.motionModels.
+    """
+    return Path(path_points(Vector(**start), Vector(**end), rng=rng, model=model))
 
 
 def get_random_box_point(
-    box: Dict, padding_percentage: Optional[float] = None
+    box: Dict, padding_percentage: Optional[float] = None, rng: RandomSource = None
 ) -> Vector:
     """Get a random point on a box"""
+    x, y = randomBlock(rng, 2).tolist()
     paddingWidth = paddingHeight = 0
     if (
         padding_percentage is not None
@@ -69,8 +239,6 @@ def get_random_box_point(
         paddingWidth = box["width"] * padding_percentage / 100
         paddingHeight = box["height"] * padding_percentage / 100
     return Vector(
-        box["x"] + (paddingWidth / 2) + random.random() * (box["width"] - paddingWidth),
-        box["y"]
-        + (paddingHeight / 2)
-        + random.random() * (box["height"] - paddingHeight),
+        box["x"] + (paddingWidth / 2) + x * (box["width"] - paddingWidth),
+        box["y"] + (paddingHeight / 2) + y * (box["height"] - paddingHeight),
     )
@@ -0,0 +1,93 @@
+import time
+import numpy as np
+from typing import Callable, Iterator, Sequence, Tuple, Union
+from python_ghost_cursor.shared._math import Vector
+from python_ghost_cursor.shared._spoof import fitts, defaultWidth
+from python_ghost_cursor.shared._path import Path
+
+# Movement time in seconds is movementTimeBase + movementTimeScale * fitts(distance, width)
+movementTimeBase = 0.1
+movementTimeScale = 0.075
+
+# Lookup table inverting the minimum-jerk position profile s(t) = 10t^3 - 15t^4 + 6t^5
+_TAU = np.linspace(0.0, 1.0, 257)
+_PROGRESS = _TAU**3 * (10 - 15 * _TAU + 6 * _TAU**2)
+
+
+def as_points(vectors: Union[np.ndarray, Sequence[Vector]]) -> np.ndarray:
+    """Get a (N, 2) array from an array or a list of vectors"""
+    if isinstance(vectors, np.ndarray):
+        return vectors
+    if isinstance(vectors, Path):
+        return vectors.points
+    return np.array([[v.x, v.y] for v in vectors], dtype=np.float64).reshape(-1, 2)
+
+
+def movement_time(distance: float, width: float = defaultWidth) -> float:
+    """How long a human takes to move over distance to a target of the given width, in seconds"""
+    return movementTimeBase + movementTimeScale * fitts(distance, width)
+
+
+def movement_timestamps(
+    vectors: Union[np.ndarray, Sequence[Vector]], width: float = defaultWidth
+) -> np.ndarray:
+    """Get the time in seconds at which each point of a path should be reached.
+
+    The total duration follows Fitts's law and the speed along the path follows a
+    minimum-jerk profile: slow start, peak speed half way, slow approach.
+    """
+    points = as_points(vectors)
+    if len(points) < 2:
+        return np.zeros(len(points))
+    arc = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(points, axis=0).T))])
+    if arc[-1] == 0:
+        return np.zeros(len(points))
+    duration = movement_time(np.hypot(*(points[-1] - points[0])), width)
+    return np.interp(arc / arc[-1], _PROGRESS, _TAU) * duration
+
+
+def playback(
+    timestamps: np.ndarray, clock: Callable[[], float] = time.monotonic
+) -> Iterator[Tuple[float, int]]:
+    """Schedule the points of a path against a monotonic clock.
+
+    Yields (delay, index) pairs: wait delay seconds, then send point index. The
+    clock is read again every time the generator is resumed, so when sending falls
+    behind, the points that are already overdue are dropped and only the latest
+    one is sent. The last point is never dropped.
+    """
+    start = clock()
+    index = 0
+    last = len(timestamps) - 1
+    while index <= last:
+        elapsed = clock() - start
+        delay = timestamps[index] - elapsed
+        if delay < 0:
+            # Jump to the latest point that is due, merging the skipped ones into it
+            index = min(
+                max(index, int(np.searchsorted(timestamps, elapsed, "right")) - 1),
+                last,
+            )
+            delay = 0.0
+        yield delay, index
+        index += 1
+
+
+def resample_path(
+    vectors: Union[np.ndarray, Sequence[Vector]], count: int
+) -> np.ndarray:
+    """Resample a path to count points along its arc length.
+
+    The new points lie on the polyline of the old ones and keep their spacing
+    profile: where the old points are close together (a slow part of the move),
+    the new ones are too. The first and last points are kept.
+    """
+    points = as_points(vectors)
+    if len(points) < 2 or count == len(points):
+        return points
+    arc = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(points, axis=0).T))])
+    index = np.arange(len(points))
+    targets = np.interp(np.linspace(0.0, len(points) - 1, count), index, arc)
+    return np.column_stack(
+        (np.interp(targets, arc, points[:, 0]), np.interp(targets, arc, points[:, 1]))
+    )
@@ -16,9 +16,10 @@ setuptools.setup(
     author="mcolella14",
     author_email="mcolella14@gmail.com",
     license="MIT",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["benchmarks", "benchmarks.*"]),
     package_data={"python_ghost_cursor": ["js/*.js"]},
-    install_requires=["bezier"],
+    install_requires=["numpy"],
+    extras_require={"bezier": ["bezier"]},
     classifiers=[
         "Topic :: Software Development :: Testing",
         "Topic :: Internet :: WWW/HTTP :: Browsers",
@@ -0,0 +1,37 @@
+import numpy as np
+
+from python_ghost_cursor.shared._cache import PathTemplateCache
+from python_ghost_cursor.shared._math import Vector
+
+
+def test_retarget_hits_start_and_end():
+    cache = PathTemplateCache(per_bucket=2, rng=0)
+    rng = np.random.default_rng(1)
+    # Fill the buckets first, so later paths are retargeted templates
+    for _ in range(200):
+        start = Vector(*rng.uniform(0, 1500, 2).tolist())
+        end = Vector(*rng.uniform(0, 1500, 2).tolist())
+        points = cache.path_points(start, end)
+        np.testing.assert_allclose(points[0], (start.x, start.y), atol=1e-9)
+        np.testing.assert_allclose(points[-1], (end.x, end.y), atol=1e-9)
+    assert cache.hits > 0
+
+
+def test_mirrored_retarget_hits_start_and_end():
+    template = np.array([[0.0, 0.0], [0.3, 0.2], [0.7, -0.1], [1.0, 0.0]])
+    start, end = Vector(100, 700), Vector(900, 250)
+    for mirror in (False, True):
+        points = PathTemplateCache.retarget(template, start, end, mirror)
+        np.testing.assert_allclose(points[0], (100, 700))
+        np.testing.assert_allclose(points[-1], (900, 250))
+
+
+def test_eviction_respects_max_templates():
+    cache = PathTemplateCache(max_templates=5, per_bucket=2, rng=0)
+    # Distances an octave apart, each in a bucket of its own
+    for exponent in range(1, 11):
+        cache.path_points(Vector(0, 0), Vector(2**exponent + 0.5, 0))
+        assert len(cache) <= 5
+    assert len(cache) == sum(len(b.templates) for b in cache._buckets.values())
+    # The most recently used bucket is kept
+    assert cache.bucket_key(2**10 + 0.5, 100) in cache._buckets
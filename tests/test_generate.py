@@ -0,0 +1,32 @@
+import os
+
+from python_ghost_cursor.generate import generate, load_shard
+
+
+def read_dataset(out_dir, filenames):
+    with open(os.path.join(out_dir, "manifest.json"), "rb") as f:
+        manifest = f.read()
+    # Compare the arrays, the zip entries of .npz files carry a timestamp
+    shards = [
+        {key: array.tobytes() for key, array in load_shard(filename).items()}
+        for filename in filenames
+    ]
+    return manifest, [os.path.basename(filename) for filename in filenames], shards
+
+
+def test_output_does_not_depend_on_workers(tmp_path):
+    datasets = []
+    for workers in (1, 3):
+        out_dir = str(tmp_path / "workers-{}".format(workers))
+        filenames = generate(250, out_dir, seed=42, shard_size=40, workers=workers)
+        datasets.append(read_dataset(out_dir, filenames))
+    assert datasets[0] == datasets[1]
+    assert len(datasets[0][1]) == 7
+    assert not any(name.endswith(".tmp") for name in os.listdir(out_dir))
+
+
+def test_shard_layout(tmp_path):
+    (filename,) = generate(30, str(tmp_path), seed=1, shard_size=30, workers=1)
+    shard = load_shard(filename)
+    assert len(shard["starts"]) == len(shard["ends"]) == len(shard["widths"]) == 30
+    assert shard["offsets"][0] == 0 and shard["offsets"][-1] == len(shard["points"])
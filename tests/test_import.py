@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Same budget as `python -m benchmarks.run --import-budget`, in seconds
+importBudget = 0.025
+# Best of a few fresh interpreters, a single run is at the mercy of the disk cache
+repeat = 5
+
+SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import python_ghost_cursor
+seconds = time.perf_counter() - started
+print(json.dumps({"seconds": seconds, "modules": sorted(sys.modules)}))
+"""
+
+
+def import_package():
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=ROOT,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+    return json.loads(output)
+
+
+def test_import_is_under_budget():
+    best = min(import_package()["seconds"] for _ in range(repeat))
+    assert best < importBudget, "import python_ghost_cursor took {:.1f} ms".format(
+        best * 1e3
+    )
+
+
+def test_import_is_lazy():
+    modules = set(import_package()["modules"])
+    for name in ("numpy", "python_ghost_cursor.shared._spoof"):
+        assert name not in modules, "{} is loaded on import".format(name)
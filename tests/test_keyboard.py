@@ -0,0 +1,33 @@
+import numpy as np
+
+from python_ghost_cursor.shared._keyboard import keystroke_schedule, typed_text
+
+text = "Hello, World! The QUICK brown fox: 42 $ ~ tea\n"
+
+
+def test_schedule_is_seeded():
+    first = keystroke_schedule(text, 3, mistakes=0.2)
+    second = keystroke_schedule(text, 3, mistakes=0.2)
+    assert first[0].tobytes() == second[0].tobytes()
+    assert first[1] == second[1]
+
+
+def test_schedule_types_the_text():
+    for seed in range(50):
+        timestamps, events = keystroke_schedule(text, seed, mistakes=0.3)
+        assert typed_text(events) == text.replace("\n", "\r")
+        assert len(timestamps) == len(events)
+        assert timestamps[0] >= 0 and np.all(np.diff(timestamps) >= 0)
+
+
+def test_keys_are_released():
+    timestamps, events = keystroke_schedule(text, 0, mistakes=0.3)
+    held = set()
+    for event in events:
+        if event["type"] == "keyUp":
+            assert event["key"] in held
+            held.remove(event["key"])
+        else:
+            assert event["key"] not in held
+            held.add(event["key"])
+    assert not held
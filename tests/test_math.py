@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from python_ghost_cursor.shared._math import (
+    Vector,
+    bezierEvaluate,
+    bezierLength,
+    bezierNodes,
+    bezierNodesBatch,
+)
+
+bezier = pytest.importorskip("bezier")
+
+
+def random_curves(kind, count=200, seed=0):
+    """Seeded (4, 2) control points: arbitrary cubics, or the curves paths are made of"""
+    rng = np.random.default_rng(seed)
+    if kind == "arbitrary":
+        return [rng.uniform(0, 1000, (4, 2)) for _ in range(count)]
+    curves = []
+    for _ in range(count):
+        start, end = rng.uniform(0, 1500, (2, 2))
+        curves.append(bezierNodes(Vector(*start), Vector(*end), None, rng))
+    return curves
+
+
+def reference(nodes):
+    return bezier.Curve.from_nodes(np.asfortranarray(nodes.T))
+
+
+@pytest.mark.parametrize("kind", ["arbitrary", "path"])
+def test_evaluate_matches_bezier(kind):
+    s_vals = np.linspace(0.0, 1.0, 101)
+    for nodes in random_curves(kind):
+        expected = reference(nodes).evaluate_multi(s_vals).T
+        np.testing.assert_allclose(bezierEvaluate(nodes, s_vals), expected, atol=1e-9)
+
+
+@pytest.mark.parametrize("kind, rtol", [("arbitrary", 2e-3), ("path", 1e-4)])
+def test_length_matches_bezier(kind, rtol):
+    curves = random_curves(kind)
+    expected = np.array([reference(nodes).length for nodes in curves])
+    np.testing.assert_allclose(
+        [bezierLength(nodes) for nodes in curves], expected, rtol=rtol
+    )
+    # The batched form gives the same lengths
+    np.testing.assert_allclose(bezierLength(np.stack(curves)), expected, rtol=rtol)
+
+
+def test_nodes_batch_matches_nodes():
+    rng = np.random.default_rng(1)
+    starts = rng.uniform(0, 1500, (50, 2))
+    ends = rng.uniform(0, 1500, (50, 2))
+    uniforms = rng.random((50, 5))
+    spreads = np.clip(np.hypot(*(ends - starts).T), 2, 200)
+    batch = bezierNodesBatch(starts, ends, spreads, uniforms)
+    for i in range(50):
+        nodes = bezierNodes(
+            Vector(*starts[i]), Vector(*ends[i]), None, uniforms=uniforms[i].tolist()
+        )
+        np.testing.assert_allclose(batch[i], nodes, atol=1e-9)
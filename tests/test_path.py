@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from python_ghost_cursor.shared._path import Path
+
+
+def make_path():
+    return Path(np.arange(10, dtype=np.float64).reshape(5, 2))
+
+
+def test_asarray_is_the_points():
+    path = make_path()
+    assert np.asarray(path) is path.points
+    assert np.asarray(path, copy=False) is path.points
+
+
+def test_array_copies():
+    path = make_path()
+    copied = np.array(path)
+    assert not np.shares_memory(copied, path.points)
+    np.testing.assert_array_equal(copied, path.points)
+
+
+def test_dtype_conversion():
+    path = make_path()
+    assert np.asarray(path, np.float32).dtype == np.float32
+    with pytest.raises(ValueError):
+        np.asarray(path, np.float32, copy=False)
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import numpy as np
+
+from python_ghost_cursor.shared._core import CursorCore, drive_async
+from python_ghost_cursor.shared._math import Vector
+from python_ghost_cursor.shared._recording import (
+    DOWN,
+    MOVE,
+    UP,
+    TrajectoryRecorder,
+    read_trajectories,
+    records_from_path,
+    recordDtype,
+)
+
+
+class FakeCursor(CursorCore):
+    """Sends nothing, notes the moves and clicks it is asked for"""
+
+    def __init__(self):
+        super().__init__(Vector(0, 0), rng=0)
+        self.moves = []
+        self.clicks = []
+
+    def _is_connected(self):
+        return True
+
+    async def _mouse_move(self, v):
+        self.moves.append((v.x, v.y))
+
+    async def _cdp_move(self, v, pressed):
+        self.moves.append((v.x, v.y))
+
+    async def _on_dispatch(self, command):
+        return await self._dispatch_async(command)
+
+    async def _on_sleep(self, command):
+        await asyncio.sleep(command.seconds)
+
+    async def _on_mouse_down(self, command):
+        self.clicks.append((DOWN, time.monotonic()))
+
+    async def _on_mouse_up(self, command):
+        self.clicks.append((UP, time.monotonic()))
+
+
+def make_records():
+    rng = np.random.default_rng(0)
+    first = records_from_path(rng.uniform(0, 1000, (20, 2)), np.linspace(0, 0.2, 20))
+    second = records_from_path(
+        rng.uniform(0, 1000, (15, 2)), np.linspace(0.4, 0.55, 15), path=1
+    )
+    clicks = np.zeros(2, recordDtype)
+    clicks[0] = (0.25, first["x"][-1], first["y"][-1], 1, DOWN)
+    clicks[1] = (0.3, first["x"][-1], first["y"][-1], 1, UP)
+    return np.concatenate([first, clicks, second])
+
+
+def test_log_round_trip(tmp_path):
+    filename = tmp_path / "paths.log"
+    records = make_records()
+    with TrajectoryRecorder(filename) as recorder:
+        recorder.write(records)
+    assert read_trajectories(filename).tobytes() == records.tobytes()
+    # Appending continues the path numbers
+    with TrajectoryRecorder(filename) as recorder:
+        assert recorder.path == 2
+
+
+def test_torn_record_is_dropped(tmp_path):
+    filename = tmp_path / "paths.log"
+    records = make_records()
+    with TrajectoryRecorder(filename) as recorder:
+        recorder.write(records)
+    with open(filename, "ab") as f:
+        f.write(b"\0" * (recordDtype.itemsize // 2))
+    assert read_trajectories(filename).tobytes() == records.tobytes()
+    with TrajectoryRecorder(filename) as recorder:
+        recorder.write(records[:1])
+    assert len(read_trajectories(filename)) == len(records) + 1
+
+
+def test_replay_keeps_points_and_timing(tmp_path):
+    source, replayed = tmp_path / "source.log", tmp_path / "replayed.log"
+    records = make_records()
+    with TrajectoryRecorder(source) as recorder:
+        recorder.write(records)
+
+    cursor = FakeCursor()
+    with TrajectoryRecorder(replayed) as recorder:
+        cursor.recorder = recorder
+        started = time.monotonic()
+        asyncio.run(drive_async(cursor._replay_plan(source), cursor._execute))
+    moves = records[records["kind"] == MOVE]
+    np.testing.assert_array_equal(
+        cursor.moves, np.column_stack((moves["x"], moves["y"]))
+    )
+    assert [kind for kind, _ in cursor.clicks] == [DOWN, UP]
+    for (_, at), expected in zip(cursor.clicks, (0.25, 0.3)):
+        assert abs(at - started - expected) < 0.05
+
+    # The points are logged again at their scheduled times
+    result = read_trajectories(replayed)
+    assert result["kind"].tolist() == records["kind"].tolist()
+    np.testing.assert_array_equal(result["x"], records["x"])
+    np.testing.assert_array_equal(result["y"], records["y"])
+    for path in (0, 1):
+        mask = (records["kind"] == MOVE) & (records["path"] == path)
+        times = result["time"][mask]
+        expected = records["time"][mask]
+        np.testing.assert_allclose(times - times[0], expected - expected[0], atol=1e-9)
+    np.testing.assert_allclose(result["time"], records["time"], atol=0.05)
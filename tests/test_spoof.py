@@ -0,0 +1,36 @@
+import numpy as np
+
+from python_ghost_cursor.shared._math import Vector
+from python_ghost_cursor.shared._spoof import path_batch, path_points, split_batch
+
+
+def random_pairs(count=100, seed=0):
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform(0, 1500, (count, 2))
+    ends = rng.uniform(0, 1500, (count, 2))
+    widths = rng.uniform(10, 300, count)
+    return starts, ends, widths
+
+
+def test_path_batch_rows_are_path_points():
+    starts, ends, widths = random_pairs()
+    points, offsets = path_batch(starts, ends, widths, seed=1)
+    assert offsets[0] == 0 and offsets[-1] == len(points)
+    # path_batch draws one row of uniforms per path, like path_points does per call
+    rng = np.random.default_rng(1)
+    for row, start, end, width in zip(
+        split_batch(points, offsets), starts, ends, widths
+    ):
+        expected = path_points(
+            Vector(*start), {"x": end[0], "y": end[1], "width": width}, rng=rng
+        )
+        assert row.shape == expected.shape
+        np.testing.assert_allclose(row, expected, rtol=0, atol=1e-9)
+
+
+def test_path_batch_is_seeded():
+    starts, ends, widths = random_pairs()
+    first = path_batch(starts, ends, widths, seed=7)
+    second = path_batch(starts, ends, widths, seed=7)
+    for a, b in zip(first, second):
+        assert a.tobytes() == b.tobytes()